@@ -1,20 +1,54 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, Response
+from starlette.concurrency import run_in_threadpool
 from typing import Literal
 from pydantic import BaseModel
+import asyncio
 import json
-from config import WORKSPACES_DIR
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from config import (
+    WORKSPACES_DIR,
+    MAX_UPLOAD_REQUEST_BYTES,
+    ADMISSION_WORKERS,
+    ADMISSION_MAX_PENDING,
+    STATUS_MAX_WAIT_SECONDS,
+)
 from services.job_orchestrator import JobOrchestrator
-from fastapi.responses import FileResponse
-import zipfile
-import tempfile
+from services import (
+    job_index,
+    job_journal,
+    runner_pool,
+    job_status_service,
+    log_stream_service,
+    report_archive,
+    workspace_retention,
+)
+from validators import contract_registry
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import model_validator
+from pydantic import model_validator, Field
 
 app = FastAPI(
     title="Secure DevSecOps Pipeline",
     version="1.0.0"
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    # Refuse on Content-Length before the multipart body is read
+    if request.url.path == "/api/jobs/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() \
+                and int(content_length) > MAX_UPLOAD_REQUEST_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": "Uploaded file exceeds maximum allowed size"},
+            )
+
+    return await call_next(request)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -23,10 +57,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 orchestrator = JobOrchestrator()
 
+
+@app.on_event("startup")
+def _cleanup_temp_archives():
+    report_archive.cleanup_orphaned_temp_archives()
+
+
+@app.on_event("startup")
+def _load_contracts():
+    # compile once, a broken contract fails the startup instead of an admission
+    contract_registry.load_contracts()
+
+
+# Admission does disk, git and validation work: keep it off the event loop
+# in its own bounded pool so status polling is never starved.
+admission_executor = ThreadPoolExecutor(
+    max_workers=ADMISSION_WORKERS,
+    thread_name_prefix="admission",
+)
+admission_slots = asyncio.Semaphore(ADMISSION_MAX_PENDING)
+
+
+async def _run_admission(func, **kwargs):
+    if admission_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many jobs are being admitted, retry later"
+        )
+
+    async with admission_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            admission_executor, partial(func, **kwargs)
+        )
+
+
 # ---------- Models ----------
 
 class Stack(BaseModel):
@@ -49,6 +119,8 @@ class Pipeline(BaseModel):
     run_secret_scan: bool = False
     secret_scan_mode: Literal["dir", "git", "custom"] = "dir"
     secret_custom: CustomToolConfig | None = None
+    # git mode: rescan the whole history instead of the commits since the last scan
+    secret_scan_full: bool = False
 
     run_build: bool = False
     run_unit_tests: bool = False
@@ -62,6 +134,20 @@ class Pipeline(BaseModel):
     run_smoke: bool = False
     run_dast: bool = False
 
+    # stages of this job allowed to run at the same time (default: worker config)
+    max_parallel_stages: int | None = Field(default=None, ge=1, le=8)
+
+    # reuse scanner results of an identical earlier submission
+    use_result_cache: bool = True
+
+    # maven: TEST / PACKAGE build on BUILD's output instead of clean rebuilds
+    incremental_build: bool = True
+    # mvn -T, e.g. "4" or "1C" (threads per core)
+    maven_threads: str | None = Field(default=None, pattern=r"^[1-9][0-9]*C?$")
+    # surefire forkCount / reuseForks for the TEST stage
+    surefire_fork_count: str | None = Field(default=None, pattern=r"^[0-9]+(\.[0-9]+)?C?$")
+    surefire_reuse_forks: bool | None = None
+
     @model_validator(mode="after")
     def validate_custom_tools(self):
         if self.sast_mode == "custom" and not self.sast_custom:
@@ -93,7 +179,8 @@ async def create_job_from_zip(
 
     try:
         meta = json.loads(metadata)
-        return orchestrator.create_job_from_zip_input(
+        return await _run_admission(
+            orchestrator.create_job_from_zip_input,
             file=project_zip,
             metadata=meta
         )
@@ -104,7 +191,8 @@ async def create_job_from_zip(
 @app.post("/api/jobs/github", status_code=201)
 async def create_job_from_github(payload: GitHubJobRequest):
     try:
-        return orchestrator.create_job_from_repo_input(
+        return await _run_admission(
+            orchestrator.create_job_from_repo_input,
             github_url=payload.github_url,
             metadata=payload.dict()
         )
@@ -112,92 +200,145 @@ async def create_job_from_github(payload: GitHubJobRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _parse_timestamp(value: str | None, name: str) -> str | None:
+    """Normalize an ISO-8601 filter to the index format (UTC, seconds)."""
+    if not value:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} timestamp")
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@app.get("/api/jobs")
+def list_jobs(
+    limit: int = 20,
+    cursor: str | None = None,
+    state: str | None = None,
+    stack: str | None = None,
+    input_type: Literal["zip", "github"] | None = None,
+    failed_stage: str | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+):
+    try:
+        return job_index.list_jobs(
+            limit=limit,
+            cursor=cursor,
+            state=state,
+            stack=stack,
+            input_type=input_type,
+            failed_stage=failed_stage,
+            created_after=_parse_timestamp(created_after, "created_after"),
+            created_before=_parse_timestamp(created_before, "created_before"),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _parse_wait(wait: str | None) -> float:
+    """Parse the long-poll `wait` parameter (`30`, `30s`)."""
+    if not wait:
+        return 0
+
+    try:
+        seconds = float(wait[:-1] if wait.endswith("s") else wait)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid wait duration")
+
+    return min(max(seconds, 0), STATUS_MAX_WAIT_SECONDS)
+
+
 @app.get("/api/jobs/{job_id}/status")
-def get_job_status(job_id: str):
-    job_dir = WORKSPACES_DIR / job_id
+async def get_job_status(job_id: str, request: Request, wait: str | None = None):
+    if_none_match = request.headers.get("if-none-match")
+    timeout = _parse_wait(wait)
 
-    # --------------------------------------------------
-    # 1. Validate job exists
-    # --------------------------------------------------
-    if not job_dir.exists() or not job_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        # --------------------------------------------------
+        # 1. Long-poll: hold the request until the status changes
+        # --------------------------------------------------
+        if timeout:
+            baseline = if_none_match or await run_in_threadpool(
+                job_status_service.current_etag, job_id
+            )
+            await job_status_service.wait_for_change(job_id, baseline, timeout)
 
-    metadata_path = job_dir / "metadata.json"
-    if not metadata_path.exists():
+        # --------------------------------------------------
+        # 2. Cached status (files only re-read after a change)
+        # --------------------------------------------------
+        etag, body = await run_in_threadpool(
+            job_status_service.get_job_status, job_id
+        )
+
+    except job_status_service.JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except workspace_retention.WorkspaceGoneError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except RuntimeError:
         raise HTTPException(
             status_code=500,
             detail="Job metadata missing or corrupted"
         )
 
-    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
-    state_path = job_dir / "state.json"
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
 
-    # --------------------------------------------------
-    # 2. Build static job block
-    # --------------------------------------------------
-    job_block = {
-        "id": metadata.get("job_id"),
-        "admission_status": metadata.get("status"),
-        "created_at": metadata.get("created_at"),
-        "stack": metadata.get("stack"),
-        "versions": metadata.get("versions"),
-    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
 
-    # --------------------------------------------------
-    # 3. Job still QUEUED (state.json not yet created)
-    # --------------------------------------------------
-    if not state_path.exists():
-        stages = {}
-        pipeline = metadata.get("pipeline", {})
-
-        stage_map = [
-            ("run_secret_scan", "SECRETS"),
-            ("run_build", "BUILD"),
-            ("run_unit_tests", "TEST"),
-            ("run_sast", "SAST"),
-            ("run_sca", "SCA"),
-            ("run_package", "PACKAGE"),
-            ("run_smoke", "SMOKE-TEST"),
-            ("run_dast", "DAST"),
-        ]
-
-        for flag, stage in stage_map:
-            stages[stage] = {
-                "status": "PENDING" if pipeline.get(flag, False) else "SKIPPED",
-                "message": None
-            }
-
-        return {
-            "job": job_block,
-            "execution": {
-                "state": "QUEUED",
-                "current_stage": None,
-                "updated_at": metadata.get("created_at"),
-                "stages": stages,
-            },
-        }
+    return JSONResponse(body, headers=headers)
 
-    # --------------------------------------------------
-    # 4. Job RUNNING / FINISHED
-    # --------------------------------------------------
-    state = json.loads(state_path.read_text(encoding="utf-8"))
 
-    execution_block = {
-        "state": state.get("state"),
-        "current_stage": state.get("current_stage"),
-        "updated_at": state.get("updated_at"),
-        "stages": state.get("stages", {}),
-    }
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str, offset: int = 0, limit: int | None = None):
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="Invalid offset or limit")
+
+    try:
+        body = await run_in_threadpool(
+            job_status_service.get_job_events, job_id, offset, limit
+        )
+    except job_status_service.JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except workspace_retention.WorkspaceGoneError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError:
+        raise HTTPException(
+            status_code=500,
+            detail="Job metadata missing or corrupted"
+        )
+
+    return JSONResponse(body, headers={"Cache-Control": "no-cache"})
+
 
-    return {
-        "job": job_block,
-        "execution": execution_block,
-    }
+def _ensure_job_data_available(job_id: str):
+    """410 once retention evicted the job reports / logs."""
+    try:
+        workspace_retention.ensure_available(job_id)
+    except workspace_retention.WorkspaceGoneError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+
+def _load_job_state(job_dir) -> dict | None:
+    try:
+        return job_journal.load_state(job_dir)
+    except ValueError:
+        # journal replaced by a retried execution: last snapshot
+        return job_journal.load_snapshot(job_dir)
 
 
 @app.get("/api/jobs/{job_id}/reports")
-def download_job_reports(job_id: str):
+def download_job_reports(job_id: str, request: Request):
     job_dir = WORKSPACES_DIR / job_id
+    _ensure_job_data_available(job_id)
 
     # --------------------------------------------------
     # 1. Validate job exists
@@ -206,20 +347,18 @@ def download_job_reports(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
 
     metadata_path = job_dir / "metadata.json"
-    state_path = job_dir / "state.json"
     reports_dir = job_dir / "reports"
 
     if not metadata_path.exists():
         raise HTTPException(status_code=500, detail="Job metadata missing")
 
-    if not state_path.exists():
+    state = _load_job_state(job_dir)
+    if state is None:
         raise HTTPException(
             status_code=409,
             detail="Job has not started yet"
         )
 
-    state = json.loads(state_path.read_text(encoding="utf-8"))
-
     # --------------------------------------------------
     # 2. Ensure job is finished
     # --------------------------------------------------
@@ -236,41 +375,40 @@ def download_job_reports(job_id: str):
         )
 
     # --------------------------------------------------
-    # 3. Create ZIP archive (temp)
+    # 3. Cached archive for the current reports
     # --------------------------------------------------
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp:
-        zip_path = tmp.name
+    filename = f"{job_id}-reports.zip"
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for file_path in reports_dir.rglob("*"):
-            if file_path.is_file():
-                arcname = file_path.relative_to(reports_dir)
-                zipf.write(file_path, arcname)
+    try:
+        archive, fingerprint = report_archive.build_report_archive(job_dir)
+    except OSError as e:
+        # cannot write the archive (disk full, read-only): stream it instead
+        print(f"Warning: streaming reports of {job_id} without archive: {e}")
+        return StreamingResponse(
+            report_archive.iter_report_zip(reports_dir),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    etag = f'"{fingerprint}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
     # --------------------------------------------------
-    # 4. Return ZIP file
+    # 4. Return ZIP file (Range requests handled by FileResponse)
     # --------------------------------------------------
     return FileResponse(
-        zip_path,
+        archive,
         media_type="application/zip",
-        filename=f"{job_id}-reports.zip",
+        filename=filename,
+        headers={"ETag": etag},
     )
 
-STAGE_LOG_FILES = {
-    "SECRETS": ["secrets-dir.json", "secrets-git.json"],
-    "BUILD": ["build.log"],
-    "TEST": ["test.log"],
-    "SAST": ["sast.json"],
-    "SCA": ["sca.json"],
-    "PACKAGE": ["package.log"],
-    "SMOKE-TEST": ["smoke-test.log"],
-    "DAST": ["dast.json"],
-}
-
 @app.get("/api/jobs/{job_id}/{stage}/logs")
 def get_stage_logs(job_id: str, stage: str):
     stage = stage.upper()
     job_dir = WORKSPACES_DIR / job_id
+    _ensure_job_data_available(job_id)
 
     # --------------------------------------------------
     # 1. Validate job & state
@@ -278,14 +416,13 @@ def get_stage_logs(job_id: str, stage: str):
     if not job_dir.exists():
         raise HTTPException(status_code=404, detail="Job not found")
 
-    state_path = job_dir / "state.json"
-    if not state_path.exists():
+    state = _load_job_state(job_dir)
+    if state is None:
         raise HTTPException(
             status_code=409,
             detail="Job has not started yet"
         )
 
-    state = json.loads(state_path.read_text(encoding="utf-8"))
     stages = state.get("stages", {})
 
     # --------------------------------------------------
@@ -320,17 +457,7 @@ def get_stage_logs(job_id: str, stage: str):
         )
 
     pipeline = json.loads((job_dir / "metadata.json").read_text()).get("pipeline", {})
-
-    if stage == "SAST" and pipeline.get("sast_mode") == "custom":
-        ext = pipeline["sast_custom"].get("log_ext", "json")
-        expected_files = [f"SAST.{ext}"]
-
-    elif stage == "SECRETS" and pipeline.get("secret_scan_mode") == "custom":
-        ext = pipeline["secret_custom"].get("log_ext", "json")
-        expected_files = [f"SECRETS.{ext}"]
-
-    else:
-        expected_files = STAGE_LOG_FILES.get(stage)
+    expected_files = log_stream_service.expected_log_files(stage, pipeline)
 
     if not expected_files:
         raise HTTPException(
@@ -352,6 +479,70 @@ def get_stage_logs(job_id: str, stage: str):
         detail=f"No log file found for stage {stage}"
     )
 
+@app.get("/api/jobs/{job_id}/{stage}/logs/stream")
+async def stream_stage_logs(job_id: str, stage: str):
+    stage = stage.upper()
+
+    # --------------------------------------------------
+    # 1. Validate job & stage
+    # --------------------------------------------------
+    try:
+        _, status = await run_in_threadpool(
+            job_status_service.get_job_status, job_id
+        )
+    except job_status_service.JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except workspace_retention.WorkspaceGoneError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except RuntimeError:
+        raise HTTPException(status_code=500, detail="Job metadata missing")
+
+    await run_in_threadpool(_ensure_job_data_available, job_id)
+
+    stages = status["execution"]["stages"]
+    if stage not in stages:
+        raise HTTPException(status_code=404, detail="Stage not found")
+
+    if stages[stage].get("status") == "SKIPPED":
+        raise HTTPException(
+            status_code=404,
+            detail=f"Stage {stage} was skipped"
+        )
+
+    metadata = json.loads(
+        (WORKSPACES_DIR / job_id / "metadata.json").read_text(encoding="utf-8")
+    )
+    expected_files = log_stream_service.expected_log_files(
+        stage, metadata.get("pipeline", {})
+    )
+
+    if not expected_files:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No logs defined for stage {stage}"
+        )
+
+    # --------------------------------------------------
+    # 2. Tail the log while the stage runs
+    # --------------------------------------------------
+    return StreamingResponse(
+        log_stream_service.stream_stage_log(job_id, stage, expected_files),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+@app.get("/api/runners/pool")
+def get_runner_pool_metrics():
+    try:
+        return runner_pool.metrics()
+    except Exception:
+        raise HTTPException(
+            status_code=503,
+            detail="Runner pool metrics unavailable"
+        )
+
 # Swagger UI
 # http://127.0.0.1:8000/docs
-
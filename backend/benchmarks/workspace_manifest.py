@@ -0,0 +1,182 @@
+"""
+Admission walk benchmark: the legacy repeated walks (scan_repo rglob,
+validate_structure glob + rglob, permission os.walk + rglob('*.sh'))
+against the single-pass workspace manifest.
+
+Runs on the projects in tests/fixtures. --copies replicates each project
+inside its workspace to approximate large (10k+ files) repositories.
+
+Usage (from backend/):
+    python -m benchmarks.workspace_manifest [--copies 20] [--rounds 5]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from config import MAX_FILES, MAX_UNCOMPRESSED_BYTES, MAX_DEPTH
+from services.pipeline_installer import PIPELINES_ROOT
+from tasks.job_execution import _prepare_workspace_permissions
+from utils import workspace_manifest
+from utils.content_safety import reject_dangerous_file
+from utils.repo_safety import scan_repo
+from utils.zip_safety import path_depth
+from validators.contract_registry import get_contract
+from validators.structure_validator import validate_structure
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+FIXTURES_DIR = BACKEND_DIR / "tests" / "fixtures"
+CONTRACT_PATH = BACKEND_DIR / "contracts" / "spring-boot-maven.json"
+CONTRACT = get_contract({"framework": "spring-boot", "build_tool": "maven"})
+
+
+# ---------------------------------------------------------------------
+# Legacy walks, as they were before the manifest
+# ---------------------------------------------------------------------
+
+def _legacy_scan_repo(repo_dir: Path):
+    total_size = 0
+    file_count = 0
+
+    for path in repo_dir.rglob("*"):
+        if path.is_dir():
+            continue
+
+        file_count += 1
+        if file_count > MAX_FILES:
+            raise ValueError("Repository contains too many files")
+
+        if path_depth(str(path.relative_to(repo_dir))) > MAX_DEPTH:
+            raise ValueError("Repository directory depth exceeded")
+
+        total_size += path.stat().st_size
+        if total_size > MAX_UNCOMPRESSED_BYTES:
+            raise ValueError("Repository size limit exceeded")
+
+        reject_dangerous_file(path)
+
+
+def _legacy_validate(source_dir: Path):
+    contract = json.loads(CONTRACT_PATH.read_text())
+
+    for rel_path in contract.get("required_paths", []):
+        (source_dir / rel_path).exists()
+
+    for rule in contract.get("required_files", []):
+        glob.glob(str(source_dir / rule["pattern"]), recursive=True)
+
+    for check in contract.get("semantic_checks", []):
+        if check["type"] == "contains_text":
+            for file in source_dir.rglob("*.java"):
+                check["value"] in file.read_text(errors="ignore")
+
+    for rel_path in contract.get("optional_paths", []):
+        (source_dir / rel_path).exists()
+
+
+def _legacy_permissions(job_dir: Path):
+    for root, dirs, files in os.walk(job_dir):
+        os.chmod(root, 0o777)
+        for d in dirs:
+            os.chmod(os.path.join(root, d), 0o777)
+        for f in files:
+            os.chmod(os.path.join(root, f), 0o666)
+
+    for script in (job_dir / "pipelines").rglob("*.sh"):
+        script.chmod(0o755)
+
+
+def legacy(job_dir: Path):
+    source_dir = job_dir / "source"
+    _legacy_scan_repo(source_dir)
+    _legacy_validate(source_dir)
+    _legacy_permissions(job_dir)
+
+
+def manifest(job_dir: Path):
+    source_dir = job_dir / "source"
+    result = scan_repo(
+        source_dir,
+        max_files=MAX_FILES,
+        max_bytes=MAX_UNCOMPRESSED_BYTES,
+        max_depth=MAX_DEPTH,
+    )
+    validate_structure(source_dir, CONTRACT, result)
+    result.save(job_dir / workspace_manifest.MANIFEST_FILE)
+    _prepare_workspace_permissions(job_dir)
+
+
+# ---------------------------------------------------------------------
+# Workspace setup
+# ---------------------------------------------------------------------
+
+def _prepare_job_dir(fixture: Path, base: Path, copies: int) -> tuple[Path, int]:
+    job_dir = base / fixture.stem
+    source_dir = job_dir / "source"
+
+    with zipfile.ZipFile(fixture) as zf:
+        zf.extractall(job_dir / "extract")
+
+    roots = list((job_dir / "extract").iterdir())
+    project = roots[0] if len(roots) == 1 and roots[0].is_dir() else job_dir / "extract"
+    shutil.move(str(project), source_dir)
+
+    # extra copies live under a subdirectory so the contract checks still
+    # see exactly one project at the root
+    for i in range(1, copies):
+        shutil.copytree(source_dir, source_dir / "copies" / f"copy-{i}",
+                        ignore=shutil.ignore_patterns("copies"))
+
+    shutil.copytree(PIPELINES_ROOT, job_dir / "pipelines")
+    file_count = sum(len(files) for _, _, files in os.walk(source_dir))
+    return job_dir, file_count
+
+
+def _reset_modes(job_dir: Path):
+    # back to the modes an extraction leaves, so every round does real work
+    for root, dirs, files in os.walk(job_dir):
+        os.chmod(root, 0o755)
+        for f in files:
+            os.chmod(os.path.join(root, f), 0o644)
+
+
+def _measure(func, job_dir: Path, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        _reset_modes(job_dir)
+        (job_dir / workspace_manifest.MANIFEST_FILE).unlink(missing_ok=True)
+        start = time.perf_counter()
+        func(job_dir)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<20} {'files':>7} {'legacy ms':>10} {'manifest ms':>12} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fixture in sorted(FIXTURES_DIR.glob("*.zip")):
+            job_dir, file_count = _prepare_job_dir(fixture, Path(tmp), args.copies)
+
+            legacy_ms = _measure(legacy, job_dir, args.rounds)
+            manifest_ms = _measure(manifest, job_dir, args.rounds)
+
+            print(
+                f"{fixture.stem:<20} {file_count:>7} {legacy_ms:>10.1f} "
+                f"{manifest_ms:>12.1f} {legacy_ms / manifest_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 import os
 from celery import Celery
 
+from config import (
+    RETENTION_SWEEP_INTERVAL,
+    TRIVY_DB_REFRESH_INTERVAL,
+    SEMGREP_RULES_REFRESH_INTERVAL,
+)
+
 
 def get_worker_pool():
     return os.getenv("CELERY_WORKER_POOL", "prefork")
@@ -30,8 +36,37 @@ celery_app.conf.update(
     # important for long-running jobs
     task_acks_late=True,
     worker_prefetch_multiplier=1,
+
+    # periodic maintenance (run by `celery beat`)
+    beat_schedule={
+        "sweep-workspaces": {
+            "task": "sweep_workspaces",
+            "schedule": RETENTION_SWEEP_INTERVAL,
+        },
+        "evict-maven-cache": {
+            "task": "evict_maven_cache",
+            "schedule": 3600,
+        },
+        "evict-git-mirrors": {
+            "task": "evict_git_mirrors",
+            "schedule": 3600,
+        },
+        "refresh-trivy-db": {
+            "task": "refresh_trivy_db",
+            "schedule": TRIVY_DB_REFRESH_INTERVAL,
+        },
+        "refresh-semgrep-rules": {
+            "task": "refresh_semgrep_rules",
+            "schedule": SEMGREP_RULES_REFRESH_INTERVAL,
+        },
+        "prune-stage-results": {
+            "task": "prune_stage_results",
+            "schedule": 3600,
+        },
+    },
 )
 
 # auto-discover tasks
 import tasks.job_execution
+import tasks.maintenance
 
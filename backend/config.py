@@ -3,15 +3,19 @@ import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 WORKSPACES_DIR = Path("/workspaces")
-HOST_WORKSPACES_PATH = os.getenv("HOST_WORKSPACES_PATH", str(WORKSPACES_DIR))
+# compose passes unset variables as "": treat empty like unset
+HOST_WORKSPACES_PATH = os.getenv("HOST_WORKSPACES_PATH") or str(WORKSPACES_DIR)
 
 MAX_UPLOAD_BYTES = 50 * 1024 * 1024        # 50 MB
+MAX_UPLOAD_REQUEST_BYTES = MAX_UPLOAD_BYTES + 1024 * 1024  # + multipart / metadata overhead
+UPLOAD_CHUNK_BYTES = 1024 * 1024           # spool / extraction buffer size
 MAX_FILES = 10_000
 MAX_UNCOMPRESSED_BYTES = 200 * 1024 * 1024 # 200 MB
 MAX_DEPTH = 25
 
-GIT_CLONE_TIMEOUT = 60          # seconds
-GIT_MAX_DEPTH = 1               # shallow clone
+GIT_CLONE_TIMEOUT = 60          # seconds, local operations on a mirror
+GIT_MIRROR_TIMEOUT = int(os.getenv("GIT_MIRROR_TIMEOUT", "900"))  # first mirror clone / fetch
+GIT_MIRROR_MAX_BYTES = int(os.getenv("GIT_MIRROR_MAX_BYTES", str(20 * 1024 ** 3)))  # 20 GB
 
 DEFAULT_DATABASE_CONFIG = {
     "image": "postgres:15",
@@ -21,3 +25,68 @@ DEFAULT_DATABASE_CONFIG = {
     "port": 5432,
     "driver": "postgresql"
 }
+
+# Stages of one job that may run at the same time (see STAGE_DEPENDENCIES)
+MAX_PARALLEL_STAGES = int(os.getenv("MAX_PARALLEL_STAGES", "3"))
+
+# Shared caches (maven repository, ...) mounted into runner containers.
+# HOST_CACHES_PATH is the same directory as seen by the docker daemon; it
+# defaults to caches/ next to the host workspaces directory, the layout
+# of docker-compose.yml (./workspaces, ./caches)
+CACHES_DIR = Path(os.getenv("CACHES_DIR", "/caches"))
+HOST_CACHES_PATH = (
+    os.getenv("HOST_CACHES_PATH")
+    or str(Path(HOST_WORKSPACES_PATH).parent / CACHES_DIR.name)
+)
+
+MAVEN_CACHE_MAX_BYTES = int(os.getenv("MAVEN_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))  # 10 GB
+
+# Cached SECRETS / SAST / SCA results are reused for this long (seconds),
+# scanner rules and vulnerability data move on even when the source doesn't
+STAGE_RESULT_CACHE_TTL = int(os.getenv("STAGE_RESULT_CACHE_TTL", str(24 * 3600)))
+
+# Trivy vulnerability DB shared read-only by all SCA runs (upstream publishes every 6h)
+TRIVY_DB_REFRESH_INTERVAL = int(os.getenv("TRIVY_DB_REFRESH_INTERVAL", str(6 * 3600)))  # seconds
+TRIVY_DB_KEEP_VERSIONS = 3   # older DB versions are removed on refresh
+
+# Semgrep rule pack downloaded once and used offline by SAST
+SEMGREP_RULESET = os.getenv("SEMGREP_RULESET", "p/java")
+SEMGREP_RULES_REFRESH_INTERVAL = int(os.getenv("SEMGREP_RULES_REFRESH_INTERVAL", str(24 * 3600)))  # seconds
+
+# Docker Engine API (runner control plane)
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", "/var/run/docker.sock")
+
+# Redis used for shared worker state (runner pool, ...), separate db from celery
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/2")
+
+# Warm runner containers kept per runner image
+RUNNER_POOL_MIN = int(os.getenv("RUNNER_POOL_MIN", "1"))
+RUNNER_POOL_MAX = int(os.getenv("RUNNER_POOL_MAX", "4"))
+RUNNER_POOL_MAX_LEASES = int(os.getenv("RUNNER_POOL_MAX_LEASES", "20"))  # recycle after
+
+# Job admission (extraction, clone, validation) runs off the API event loop
+ADMISSION_WORKERS = int(os.getenv("ADMISSION_WORKERS", "4"))
+ADMISSION_MAX_PENDING = int(os.getenv("ADMISSION_MAX_PENDING", "32"))  # queued + running
+CONTRACT_SCAN_WORKERS = int(os.getenv("CONTRACT_SCAN_WORKERS", "4"))  # threads for contract text checks
+
+# Status endpoint
+STATUS_CACHE_SIZE = int(os.getenv("STATUS_CACHE_SIZE", "1024"))  # jobs kept in memory
+STATUS_MAX_WAIT_SECONDS = 60     # long-poll upper bound
+STATUS_POLL_INTERVAL = 0.5       # seconds between change checks while long-polling
+
+# Live log streaming (SSE)
+LOG_STREAM_POLL_INTERVAL = 0.5                 # seconds between reads of a running log
+LOG_STREAM_HISTORY_BYTES = 1024 * 1024         # tail replayed to late subscribers
+LOG_STREAM_READ_BYTES = 64 * 1024              # max bytes read per poll
+LOG_STREAM_SUBSCRIBER_QUEUE = 256              # chunks buffered per slow client
+LOG_STREAM_KEEPALIVE = 15                      # seconds
+
+# Persistent backend data (job index, ...), shared by API and workers
+DATA_DIR = Path(os.getenv("DATA_DIR", "/data"))
+JOB_INDEX_PATH = DATA_DIR / "jobs.sqlite3"
+
+# Workspace retention (tasks/maintenance.sweep_workspaces)
+WORKSPACE_QUOTA_BYTES = int(os.getenv("WORKSPACE_QUOTA_BYTES", str(50 * 1024 ** 3)))  # 50 GB
+WORKSPACE_MAX_AGE_DAYS = int(os.getenv("WORKSPACE_MAX_AGE_DAYS", "30"))
+WORKSPACE_COLD_AFTER_MINUTES = int(os.getenv("WORKSPACE_COLD_AFTER_MINUTES", "10"))
+RETENTION_SWEEP_INTERVAL = int(os.getenv("RETENTION_SWEEP_INTERVAL", "300"))  # seconds
@@ -0,0 +1,217 @@
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import tarfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+from config import CACHES_DIR, GIT_MIRROR_TIMEOUT, GIT_CLONE_TIMEOUT, GIT_MIRROR_MAX_BYTES
+
+MIRRORS_DIR = CACHES_DIR / "git-mirrors"
+LAST_FETCH = "pipelinex-last-fetch"
+LAST_USED = "pipelinex-last-used"
+
+# never wait for credentials: private / missing repos fail right away
+GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+
+def _git(*args: str, timeout: int, **kwargs):
+    return subprocess.run(
+        ["git", *args],
+        env=GIT_ENV,
+        timeout=timeout,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **kwargs,
+    )
+
+
+def repository_key(github_url: str) -> str:
+    """github.com/Owner/Repo(.git)(/) -> 'owner/repo'."""
+    owner, repo = urlparse(github_url).path.strip("/").split("/")
+    return f"{owner}/{repo.removesuffix('.git')}".lower()
+
+
+def mirror_path(github_url: str) -> Path:
+    """One bare mirror per repository."""
+    key = repository_key(github_url)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+    return MIRRORS_DIR / f"{key.replace('/', '-')}-{digest}.git"
+
+
+def _fetched_since(mirror: Path, since: float) -> bool:
+    try:
+        return (mirror / LAST_FETCH).stat().st_mtime >= since
+    except OSError:
+        return False
+
+
+def _sync(github_url: str, mirror: Path, requested_at: float):
+    if _fetched_since(mirror, requested_at):
+        # another job fetched while we waited for the lock
+        return
+
+    if (mirror / "HEAD").exists():
+        try:
+            _git("-C", str(mirror), "fetch", "--prune", "origin",
+                 timeout=GIT_MIRROR_TIMEOUT)
+            _git("-C", str(mirror), "gc", "--auto", "--quiet",
+                 timeout=GIT_MIRROR_TIMEOUT)
+        except (subprocess.SubprocessError, OSError) as e:
+            # the mirror is still usable, only possibly behind
+            print(f"Warning: could not refresh mirror of {github_url}: {e}")
+            return
+    else:
+        shutil.rmtree(mirror, ignore_errors=True)
+        partial = mirror.with_suffix(".partial")
+        shutil.rmtree(partial, ignore_errors=True)
+
+        _git("clone", "--bare", "--no-tags", github_url, str(partial),
+             timeout=GIT_MIRROR_TIMEOUT)
+        # later fetches update every branch incrementally
+        _git("-C", str(partial), "config", "remote.origin.fetch",
+             "+refs/heads/*:refs/heads/*", timeout=GIT_CLONE_TIMEOUT)
+        os.rename(partial, mirror)
+
+    (mirror / LAST_FETCH).touch()
+
+
+@contextmanager
+def checkout_mirror(github_url: str):
+    """
+    Up to date bare mirror of `github_url`.
+
+    Two per-repository locks: `.lock` serializes syncs, so concurrent
+    jobs for the same repository fetch once; `.inuse` is exclusive while
+    fetching and shared while the mirror is read. flock() cannot
+    downgrade atomically, so the shared lock is taken while `.lock` is
+    still held: eviction needs both and never sees the mirror unlocked.
+    """
+    MIRRORS_DIR.mkdir(parents=True, exist_ok=True)
+    mirror = mirror_path(github_url)
+    requested_at = time.time()
+
+    with open(mirror.with_suffix(".lock"), "a") as lock, \
+            open(mirror.with_suffix(".inuse"), "a") as in_use:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # waits for jobs still reading the mirror
+            fcntl.flock(in_use, fcntl.LOCK_EX)
+            _sync(github_url, mirror, requested_at)
+            fcntl.flock(in_use, fcntl.LOCK_SH)
+            (mirror / LAST_USED).touch()
+        except BaseException:
+            fcntl.flock(in_use, fcntl.LOCK_UN)
+            raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+        try:
+            yield mirror
+        finally:
+            fcntl.flock(in_use, fcntl.LOCK_UN)
+
+
+def head_commit(mirror: Path) -> str:
+    return subprocess.check_output(
+        ["git", "-C", str(mirror), "rev-parse", "HEAD"],
+        env=GIT_ENV,
+        text=True,
+        timeout=GIT_CLONE_TIMEOUT,
+    ).strip()
+
+
+def export_tree(mirror: Path, dest: Path, commit: str = "HEAD"):
+    """Working tree of `commit` without history (git archive, no network)."""
+    proc = subprocess.Popen(
+        ["git", "-C", str(mirror), "archive", "--format=tar", commit],
+        env=GIT_ENV,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+            tar.extractall(dest, filter="data")
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait(timeout=GIT_CLONE_TIMEOUT)
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, "git archive")
+
+
+def clone_from_mirror(mirror: Path, dest: Path, github_url: str):
+    """
+    Full-history clone for git mode scans. A local clone hard-links the
+    objects when possible and copies them otherwise; no alternates, the
+    runner container can't see the mirror. Only the default branch (the
+    mirror's HEAD) is cloned, like a direct single-branch clone: the mirror
+    holds every branch and scans must not cover the others.
+    """
+    _git("clone", "--quiet", "--no-tags", "--single-branch",
+         str(mirror), str(dest), timeout=GIT_MIRROR_TIMEOUT)
+    _git("-C", str(dest), "remote", "set-url", "origin", github_url,
+         timeout=GIT_CLONE_TIMEOUT)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def evict(max_bytes: int = GIT_MIRROR_MAX_BYTES) -> int:
+    """
+    Drop least recently used mirrors until the cache fits in max_bytes.
+    Mirrors being synced or read (locked) are skipped. Returns freed bytes.
+    """
+    if not MIRRORS_DIR.exists():
+        return 0
+
+    mirrors = []
+    for mirror in MIRRORS_DIR.glob("*.git"):
+        try:
+            last_used = (mirror / LAST_USED).stat().st_mtime
+        except OSError:
+            last_used = 0.0
+        mirrors.append((last_used, _dir_size(mirror), mirror))
+
+    total = sum(size for _, size, _ in mirrors)
+    freed = 0
+
+    for _, size, mirror in sorted(mirrors, key=lambda m: m[0]):
+        if total <= max_bytes:
+            break
+
+        # same order as checkout_mirror: .lock, then .inuse
+        with open(mirror.with_suffix(".lock"), "a") as lock, \
+                open(mirror.with_suffix(".inuse"), "a") as in_use:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                fcntl.flock(in_use, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                continue
+            try:
+                shutil.rmtree(mirror, ignore_errors=True)
+            finally:
+                fcntl.flock(in_use, fcntl.LOCK_UN)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        total -= size
+        freed += size
+
+    return freed
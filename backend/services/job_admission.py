@@ -1,9 +1,11 @@
 import json
 import time
-from pathlib import Path
 
+from validators.contract_registry import get_contract
 from validators.structure_validator import validate_structure
 from services.workspace_service import Workspace
+from services import job_index
+from utils import workspace_manifest
 
 
 def admit_job(
@@ -23,9 +25,11 @@ def admit_job(
             "Secret scan mode 'git' is not supported for ZIP inputs (no git history)"
         )
     
-    contract = Path("contracts/spring-boot-maven.json")
+    contract = get_contract(stack)
 
-    validation = validate_structure(workspace.source_dir, contract)
+    # one walk of the source tree, shared with the worker (permissions)
+    manifest = workspace.manifest or workspace_manifest.scan(workspace.source_dir)
+    validation = validate_structure(workspace.source_dir, contract, manifest)
 
     if validation.status == "REFUSED":
         raise ValueError(validation.errors)
@@ -38,6 +42,7 @@ def admit_job(
         "versions": versions,
         "pipeline": pipeline,
         "database": database, 
+        "source": workspace.source or {"type": workspace.input_type},
         "warnings": validation.warnings,
         "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
     }
@@ -46,5 +51,8 @@ def admit_job(
         json.dumps(metadata, indent=2),
         encoding="utf-8",
     )
+    manifest.save(workspace.job_dir / workspace_manifest.MANIFEST_FILE)
+
+    job_index.record_admission(workspace.job_id, metadata)
 
     return metadata
\ No newline at end of file
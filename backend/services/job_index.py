@@ -0,0 +1,436 @@
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import JOB_INDEX_PATH, WORKSPACES_DIR
+from services import job_journal
+
+# Applied in order, PRAGMA user_version records how many already ran
+MIGRATIONS = [
+    """
+    CREATE TABLE job_sequence (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        allocated_at TEXT NOT NULL
+    );
+    CREATE TABLE jobs (
+        job_id TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL UNIQUE,
+        input_type TEXT,
+        state TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    """,
+    """
+    ALTER TABLE jobs ADD COLUMN admission_status TEXT;
+    ALTER TABLE jobs ADD COLUMN language TEXT;
+    ALTER TABLE jobs ADD COLUMN framework TEXT;
+    ALTER TABLE jobs ADD COLUMN build_tool TEXT;
+    ALTER TABLE jobs ADD COLUMN stack TEXT;
+    CREATE TABLE job_failed_stages (
+        job_id TEXT NOT NULL REFERENCES jobs (job_id) ON DELETE CASCADE,
+        stage TEXT NOT NULL,
+        PRIMARY KEY (stage, job_id)
+    );
+    CREATE INDEX jobs_state_seq ON jobs (state, seq);
+    CREATE INDEX jobs_stack_seq ON jobs (stack, seq);
+    CREATE INDEX jobs_input_type_seq ON jobs (input_type, seq);
+    CREATE INDEX jobs_created_at ON jobs (created_at);
+    """,
+    """
+    ALTER TABLE jobs ADD COLUMN storage TEXT NOT NULL DEFAULT 'hot';
+    ALTER TABLE jobs ADD COLUMN disk_bytes INTEGER;
+    CREATE INDEX jobs_storage_seq ON jobs (storage, seq);
+    """,
+]
+
+# Workspace storage tiers (see services/workspace_retention)
+STORAGE_TIERS = ("hot", "cold", "evicted", "purged")
+
+# Stage statuses counted as failed (scripts report FAILED, older ones FAILURE)
+FAILED_STATUSES = {"FAILED", "FAILURE"}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_JOB_DIR_PATTERN = re.compile(r"^job-(\d+)$")
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _normalize_timestamp(value: str | None) -> str:
+    """Store every timestamp as UTC seconds so they compare as strings."""
+    if not value:
+        return _now()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return _now()
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _format_job_id(seq: int) -> str:
+    return f"job-{seq:03d}"
+
+
+def _connect() -> sqlite3.Connection:
+    JOB_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(JOB_INDEX_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for index, sql in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= index:
+                conn.execute("COMMIT")
+                continue
+            for statement in sql.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            if index == 1:
+                _seed_sequence(conn)
+            if index == 2:
+                _backfill_jobs(conn)
+            conn.execute(f"PRAGMA user_version = {index}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _seed_sequence(conn: sqlite3.Connection):
+    """
+    One-time import: continue numbering after the workspaces created
+    before the index existed.
+    """
+    highest = 0
+    if WORKSPACES_DIR.exists():
+        with os.scandir(WORKSPACES_DIR) as entries:
+            for entry in entries:
+                match = _JOB_DIR_PATTERN.match(entry.name)
+                if match and entry.is_dir():
+                    highest = max(highest, int(match.group(1)))
+
+    if highest:
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('job_sequence', ?)",
+            (highest,),
+        )
+
+
+def _backfill_input_type(job_dir, metadata: dict) -> str:
+    """Recorded source type; older jobs are told apart by their clone."""
+    source_type = (metadata.get("source") or {}).get("type")
+    if source_type:
+        return source_type
+    return "github" if (job_dir / "source" / ".git").exists() else "zip"
+
+
+def _backfill_jobs(conn: sqlite3.Connection):
+    """
+    One-time import of workspaces admitted before the index tracked
+    their metadata and execution state.
+    """
+    if not WORKSPACES_DIR.exists():
+        return
+
+    with os.scandir(WORKSPACES_DIR) as entries:
+        for entry in entries:
+            match = _JOB_DIR_PATTERN.match(entry.name)
+            if not match or not entry.is_dir():
+                continue
+
+            job_dir = WORKSPACES_DIR / entry.name
+            try:
+                metadata = json.loads((job_dir / "metadata.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (job_id, seq, input_type, state, created_at, updated_at)
+                VALUES (?, ?, ?, 'QUEUED', ?, ?)
+                """,
+                (
+                    entry.name,
+                    int(match.group(1)),
+                    _backfill_input_type(job_dir, metadata),
+                    metadata.get("created_at") or _now(),
+                    metadata.get("created_at") or _now(),
+                ),
+            )
+            _record_admission(conn, entry.name, metadata)
+
+            try:
+                state = job_journal.load_state(job_dir)
+            except (OSError, ValueError):
+                continue
+            if state:
+                _record_execution(conn, entry.name, state)
+
+
+def get_connection() -> sqlite3.Connection:
+    """Per-thread connection to the job index (created and migrated lazily)."""
+    global _initialized
+
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        with _init_lock:
+            if not _initialized:
+                _migrate(conn)
+                _initialized = True
+        _local.conn = conn
+
+    return conn
+
+
+@contextmanager
+def _transaction():
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def allocate_job_id(input_type: str) -> str:
+    """
+    Atomically reserve the next job id and register the job. Constant
+    cost, safe across threads, API workers and containers.
+    """
+    now = _now()
+
+    with _transaction() as conn:
+        seq = conn.execute(
+            "INSERT INTO job_sequence (allocated_at) VALUES (?)", (now,)
+        ).lastrowid
+        conn.execute("DELETE FROM job_sequence WHERE seq < ?", (seq,))
+
+        job_id = _format_job_id(seq)
+        conn.execute(
+            """
+            INSERT INTO jobs (job_id, seq, input_type, state, created_at, updated_at)
+            VALUES (?, ?, ?, 'ADMITTING', ?, ?)
+            """,
+            (job_id, seq, input_type, now, now),
+        )
+
+    return job_id
+
+
+def remove_job(job_id: str):
+    """Forget a job whose admission failed (its id is never reused)."""
+    with _transaction() as conn:
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+
+def _record_admission(conn: sqlite3.Connection, job_id: str, metadata: dict):
+    stack = metadata.get("stack") or {}
+    framework = stack.get("framework")
+    build_tool = stack.get("build_tool")
+
+    conn.execute(
+        """
+        UPDATE jobs
+        SET state = 'QUEUED', admission_status = ?, language = ?,
+            framework = ?, build_tool = ?, stack = ?, updated_at = ?
+        WHERE job_id = ?
+        """,
+        (
+            metadata.get("status"),
+            stack.get("language"),
+            framework,
+            build_tool,
+            f"{framework}-{build_tool}" if framework and build_tool else None,
+            metadata.get("created_at") or _now(),
+            job_id,
+        ),
+    )
+
+
+def _record_execution(conn: sqlite3.Connection, job_id: str, state: dict):
+    conn.execute(
+        "UPDATE jobs SET state = ?, updated_at = ? WHERE job_id = ?",
+        (state.get("state"), _normalize_timestamp(state.get("updated_at")), job_id),
+    )
+
+    failed = [
+        stage
+        for stage, entry in (state.get("stages") or {}).items()
+        if entry.get("status") in FAILED_STATUSES
+    ]
+    conn.execute("DELETE FROM job_failed_stages WHERE job_id = ?", (job_id,))
+    conn.executemany(
+        "INSERT INTO job_failed_stages (job_id, stage) VALUES (?, ?)",
+        [(job_id, stage) for stage in failed],
+    )
+
+
+def record_admission(job_id: str, metadata: dict):
+    """Job passed admission: index its stack and admission status."""
+    with _transaction() as conn:
+        _record_admission(conn, job_id, metadata)
+
+
+def record_execution(job_id: str, state: dict):
+    """Mirror the execution state recorded in the job journal."""
+    with _transaction() as conn:
+        _record_execution(conn, job_id, state)
+
+
+def get_job(job_id: str) -> dict | None:
+    row = get_connection().execute(
+        "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def set_storage(job_id: str, storage: str, disk_bytes: int | None):
+    if storage not in STORAGE_TIERS:
+        raise ValueError(f"Unknown storage tier: {storage}")
+
+    with _transaction() as conn:
+        conn.execute(
+            "UPDATE jobs SET storage = ?, disk_bytes = ? WHERE job_id = ?",
+            (storage, disk_bytes, job_id),
+        )
+
+
+def jobs_on_disk() -> list[dict]:
+    """Jobs that still occupy workspace storage, oldest first."""
+    rows = get_connection().execute(
+        """
+        SELECT job_id, seq, state, storage, disk_bytes, updated_at
+        FROM jobs
+        WHERE storage != 'purged'
+        ORDER BY seq
+        """
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _encode_cursor(seq: int) -> str:
+    return base64.urlsafe_b64encode(str(seq).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+
+def list_jobs(
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    state: str | None = None,
+    stack: str | None = None,
+    input_type: str | None = None,
+    failed_stage: str | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+) -> dict:
+    """
+    Newest first, keyset-paginated on the job sequence. state, stack and
+    input_type have (column, seq) indexes, so those pages cost about their
+    size. created_at ranges and failed_stage (an indexed probe per job)
+    are checked while walking the sequence: the sparser the matches, the
+    more jobs a page reads.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where = []
+    params = []
+
+    if cursor:
+        where.append("j.seq < ?")
+        params.append(_decode_cursor(cursor))
+    if state:
+        where.append("j.state = ?")
+        params.append(state.upper())
+    if stack:
+        where.append("j.stack = ?")
+        params.append(stack)
+    if input_type:
+        where.append("j.input_type = ?")
+        params.append(input_type)
+    if created_after:
+        where.append("j.created_at >= ?")
+        params.append(created_after)
+    if created_before:
+        where.append("j.created_at < ?")
+        params.append(created_before)
+    if failed_stage:
+        where.append(
+            "EXISTS (SELECT 1 FROM job_failed_stages f "
+            "WHERE f.stage = ? AND f.job_id = j.job_id)"
+        )
+        params.append(failed_stage.upper())
+
+    sql = "SELECT j.* FROM jobs j"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY j.seq DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = get_connection()
+    rows = conn.execute(sql, params).fetchall()
+    page = rows[:limit]
+
+    failed = {}
+    if page:
+        placeholders = ",".join("?" * len(page))
+        for row in conn.execute(
+            f"SELECT job_id, stage FROM job_failed_stages WHERE job_id IN ({placeholders})",
+            [row["job_id"] for row in page],
+        ):
+            failed.setdefault(row["job_id"], []).append(row["stage"])
+
+    return {
+        "items": [
+            {
+                "id": row["job_id"],
+                "state": row["state"],
+                "admission_status": row["admission_status"],
+                "input_type": row["input_type"],
+                "stack": {
+                    "language": row["language"],
+                    "framework": row["framework"],
+                    "build_tool": row["build_tool"],
+                },
+                "failed_stages": sorted(failed.get(row["job_id"], [])),
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+            }
+            for row in page
+        ],
+        "next_cursor": _encode_cursor(page[-1]["seq"]) if len(rows) > limit else None,
+    }
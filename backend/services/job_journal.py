@@ -0,0 +1,194 @@
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+# Append-only execution events of a job, one JSON object per line
+EVENTS_FILE = "events.jsonl"
+
+# Compacted state: every event up to `journal_offset` applied
+SNAPSHOT_FILE = "state.json"
+
+# Events appended between two snapshots; readers replay the rest
+SNAPSHOT_EVERY = 16
+
+# Reloads of a snapshot whose journal was replaced meanwhile (retried job)
+LOAD_RETRIES = 5
+LOAD_RETRY_DELAY = 0.02  # seconds
+
+
+def apply_event(state: dict, event: dict) -> dict:
+    """
+    Fold one event into a state document (in place). Shared by the
+    worker and every reader, so both always agree on the result.
+
+    {"type": "job", "fields": {...}}                 top-level fields
+    {"type": "stage", "stage": S, "fields": {...}}   one stage entry
+    """
+    if event["type"] == "stage":
+        stage = event["stage"]
+        entry = state["stages"][stage]
+        entry.update(event["fields"])
+
+        running = state.setdefault("running_stages", [])
+        if entry.get("status") == "RUNNING":
+            if stage not in running:
+                running.append(stage)
+        elif stage in running:
+            running.remove(stage)
+
+        state["current_stage"] = running[-1] if running else None
+    else:
+        state.update(event["fields"])
+
+    state["updated_at"] = event["ts"]
+    return state
+
+
+def read_events(
+    job_dir: Path,
+    offset: int = 0,
+    limit: int | None = None,
+    journal: int | None = None,
+) -> tuple[list[dict], int]:
+    """
+    Complete events from byte `offset` on, and the offset to continue
+    from. A line still being appended is left for the next read.
+    Raises ValueError when `offset` is not at the start of an event, or
+    when `journal` (inode the offset was taken in) is not the current file.
+    """
+    try:
+        with open(job_dir / EVENTS_FILE, "rb") as f:
+            if journal is not None and os.fstat(f.fileno()).st_ino != journal:
+                raise ValueError("journal was replaced")
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    raise ValueError(f"offset {offset} is not at an event boundary")
+            data = f.read()
+    except FileNotFoundError:
+        if offset:
+            raise ValueError(f"offset {offset} is not at an event boundary")
+        return [], offset
+
+    events = []
+    for line in data.splitlines(keepends=True):
+        if not line.endswith(b"\n") or (limit is not None and len(events) >= limit):
+            break
+        events.append(json.loads(line))
+        offset += len(line)
+
+    return events, offset
+
+
+def load_snapshot(job_dir: Path) -> dict | None:
+    """Last snapshot alone (may lag behind the journal). None before the job started."""
+    try:
+        return json.loads((job_dir / SNAPSHOT_FILE).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def load_state(job_dir: Path) -> dict | None:
+    """
+    Current state: the last snapshot plus the events appended since.
+    `journal_offset` of the result is where an event reader continues.
+    None before the job started.
+
+    A retried execution replaces the journal before its first snapshot
+    (see JobJournal), so a snapshot read just before that refers to
+    another journal file: it is reloaded. Raises ValueError when that
+    persists.
+    """
+    for attempt in range(LOAD_RETRIES):
+        state = load_snapshot(job_dir)
+        if state is None or "journal_offset" not in state:
+            # no job yet / written before jobs had a journal
+            return state
+
+        try:
+            events, state["journal_offset"] = read_events(
+                job_dir, state["journal_offset"], journal=state.pop("journal_inode", None)
+            )
+        except ValueError:
+            if attempt == LOAD_RETRIES - 1:
+                raise
+            time.sleep(LOAD_RETRY_DELAY)
+            continue
+
+        for event in events:
+            apply_event(state, event)
+        return state
+
+
+def _write_snapshot(job_dir: Path, state: dict, offset: int, journal: int):
+    target = job_dir / SNAPSHOT_FILE
+    tmp = job_dir / f".{SNAPSHOT_FILE}.{uuid.uuid4().hex}"
+    tmp.write_text(
+        json.dumps({**state, "journal_offset": offset, "journal_inode": journal}, indent=2),
+        encoding="utf-8",
+    )
+    try:
+        tmp.chmod(0o666)
+    except OSError:
+        pass
+    # readers see the previous or the new snapshot, never a partial one
+    os.replace(tmp, target)
+
+
+class JobJournal:
+    """
+    Writer side of a job's state. Events are appended to events.jsonl
+    and applied to the in-memory state; state.json is rewritten
+    (atomically) only every SNAPSHOT_EVERY events or on snapshot().
+    Not thread-safe: the worker serializes calls per job.
+    """
+
+    def __init__(self, job_dir: Path, state: dict):
+        self.job_dir = job_dir
+        self.state = state
+        self._events_path = job_dir / EVENTS_FILE
+        self._offset = 0
+        self._unsnapshotted = 0
+
+        # A retried execution starts a new history. The empty journal
+        # replaces the old one (readers that opened it keep reading it)
+        # before the new snapshot does; snapshots name their journal by
+        # inode, so a stale one is never replayed against the new file.
+        tmp = job_dir / f".{EVENTS_FILE}.{uuid.uuid4().hex}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            self._journal = os.fstat(fd).st_ino
+        finally:
+            os.close(fd)
+        try:
+            tmp.chmod(0o666)
+        except OSError:
+            pass
+        os.replace(tmp, self._events_path)
+        self.snapshot()
+
+    def record(self, event: dict) -> dict:
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+
+        fd = os.open(self._events_path, os.O_WRONLY | os.O_APPEND)
+        try:
+            view = memoryview(line)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+        self._offset += len(line)
+        apply_event(self.state, event)
+
+        self._unsnapshotted += 1
+        if self._unsnapshotted >= SNAPSHOT_EVERY:
+            self.snapshot()
+
+        return self.state
+
+    def snapshot(self):
+        _write_snapshot(self.job_dir, self.state, self._offset, self._journal)
+        self._unsnapshotted = 0
@@ -60,13 +60,12 @@ class JobOrchestrator:
             run_secret_scan = pipeline.get("run_secret_scan", False)
             secret_scan_mode = pipeline.get("secret_scan_mode", "dir")
 
+            # git mode scans need the full history in the workspace
             keep_git = run_secret_scan and secret_scan_mode == "git"
-            full_history = keep_git
 
             workspace = clone_github_repository(
                 github_url,
                 keep_git=keep_git,
-                full_history=full_history,
             )
 
             metadata = self._inject_database_config(metadata)
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import (
+    WORKSPACES_DIR,
+    STATUS_CACHE_SIZE,
+    STATUS_POLL_INTERVAL,
+)
+from services import job_journal, workspace_retention
+
+STAGE_MAP = [
+    ("run_secret_scan", "SECRETS"),
+    ("run_build", "BUILD"),
+    ("run_unit_tests", "TEST"),
+    ("run_sast", "SAST"),
+    ("run_sca", "SCA"),
+    ("run_package", "PACKAGE"),
+    ("run_smoke", "SMOKE-TEST"),
+    ("run_dast", "DAST"),
+]
+
+# job_id -> (signature, etag, status body), least recently used first
+_cache: OrderedDict[str, tuple[tuple, str, dict]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class JobNotFoundError(LookupError):
+    pass
+
+
+def _file_signature(path: Path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _signature(job_dir: Path) -> tuple:
+    """
+    Cheap version of a job's status: stat of metadata.json, the state
+    snapshot and the event journal. Changes with every recorded event.
+    """
+    if not job_dir.is_dir():
+        # raises WorkspaceGoneError for jobs removed by retention
+        workspace_retention.ensure_available(job_dir.name)
+        raise JobNotFoundError("Job not found")
+
+    metadata = _file_signature(job_dir / "metadata.json")
+    if metadata is None:
+        raise RuntimeError("Job metadata missing or corrupted")
+
+    return (
+        metadata,
+        _file_signature(job_dir / job_journal.SNAPSHOT_FILE),
+        _file_signature(job_dir / job_journal.EVENTS_FILE),
+    )
+
+
+def _etag(job_id: str, signature: tuple) -> str:
+    digest = hashlib.sha1(f"{job_id}:{signature}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _build_status(job_dir: Path) -> dict:
+    metadata = json.loads((job_dir / "metadata.json").read_text(encoding="utf-8"))
+    # snapshot + events appended since: both written atomically, no torn reads
+    try:
+        state = job_journal.load_state(job_dir)
+    except ValueError:
+        # journal unreadable (replaced by a retried execution): last snapshot
+        state = job_journal.load_snapshot(job_dir)
+
+    # --------------------------------------------------
+    # 1. Build static job block
+    # --------------------------------------------------
+    job_block = {
+        "id": metadata.get("job_id"),
+        "admission_status": metadata.get("status"),
+        "created_at": metadata.get("created_at"),
+        "stack": metadata.get("stack"),
+        "versions": metadata.get("versions"),
+    }
+
+    # --------------------------------------------------
+    # 2. Job still QUEUED (state not yet created)
+    # --------------------------------------------------
+    if state is None:
+        stages = {}
+        pipeline = metadata.get("pipeline", {})
+
+        for flag, stage in STAGE_MAP:
+            stages[stage] = {
+                "status": "PENDING" if pipeline.get(flag, False) else "SKIPPED",
+                "message": None
+            }
+
+        return {
+            "job": job_block,
+            "execution": {
+                "state": "QUEUED",
+                "current_stage": None,
+                "running_stages": [],
+                "updated_at": metadata.get("created_at"),
+                "stages": stages,
+                "events_offset": 0,
+            },
+        }
+
+    # --------------------------------------------------
+    # 3. Job RUNNING / FINISHED
+    # --------------------------------------------------
+    execution_block = {
+        "state": state.get("state"),
+        "current_stage": state.get("current_stage"),
+        "running_stages": state.get("running_stages", []),
+        "updated_at": state.get("updated_at"),
+        "stages": state.get("stages", {}),
+        # continue with GET /api/jobs/{id}/events?offset=
+        "events_offset": state.get("journal_offset", 0),
+    }
+
+    return {
+        "job": job_block,
+        "execution": execution_block,
+    }
+
+
+def current_etag(job_id: str) -> str:
+    """ETag of the job status without reading the status files."""
+    return _etag(job_id, _signature(WORKSPACES_DIR / job_id))
+
+
+def get_job_status(job_id: str) -> tuple[str, dict]:
+    """
+    Return (etag, status body). Files are only re-read and re-parsed when
+    their signature changed since the cached version.
+    """
+    job_dir = WORKSPACES_DIR / job_id
+    signature = _signature(job_dir)
+
+    with _cache_lock:
+        cached = _cache.get(job_id)
+        if cached and cached[0] == signature:
+            _cache.move_to_end(job_id)
+            return cached[1], cached[2]
+
+    try:
+        body = _build_status(job_dir)
+    except (json.JSONDecodeError, FileNotFoundError):
+        # metadata.json replaced meanwhile: the previous version is still valid
+        if cached:
+            return cached[1], cached[2]
+        raise RuntimeError("Job metadata missing or corrupted")
+
+    etag = _etag(job_id, signature)
+
+    with _cache_lock:
+        _cache[job_id] = (signature, etag, body)
+        _cache.move_to_end(job_id)
+        while len(_cache) > STATUS_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return etag, body
+
+
+def get_job_events(job_id: str, offset: int = 0, limit: int | None = None) -> dict:
+    """
+    Execution events (stage started / finished, messages, timings) from
+    byte `offset` of the job journal on, for incremental consumers.
+    """
+    job_dir = WORKSPACES_DIR / job_id
+    _signature(job_dir)
+
+    events, next_offset = job_journal.read_events(job_dir, offset, limit)
+    return {"events": events, "next_offset": next_offset}
+
+
+async def wait_for_change(job_id: str, etag: str, timeout: float) -> str:
+    """
+    Long-poll helper: wait until the job ETag differs from `etag` or the
+    timeout expires. Only stats the status files while waiting, off the
+    event loop. Returns the latest ETag.
+    """
+    deadline = time.monotonic() + timeout
+    current = await asyncio.to_thread(current_etag, job_id)
+
+    while current == etag and time.monotonic() < deadline:
+        await asyncio.sleep(min(STATUS_POLL_INTERVAL, max(0, deadline - time.monotonic())))
+        current = await asyncio.to_thread(current_etag, job_id)
+
+    return current
@@ -0,0 +1,94 @@
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable
+
+
+class LiveApp:
+    """
+    One running application (plus database) shared by SMOKE-TEST and DAST.
+
+    The compose project is brought up by the first stage needing it and
+    torn down once every stage in `stages` released it, so DAST scans the
+    instance the smoke test just checked instead of starting a new JVM
+    and database. stop() is idempotent and also called when the job ends.
+
+    `prepare` runs once, right before `up`, and returns the compose files:
+    work only the running app needs (database template, ...) is not paid
+    by jobs that never get that far.
+    """
+
+    def __init__(
+        self,
+        *,
+        job_dir: Path,
+        compose_cmd: list[str],
+        prepare: Callable[[], list[Path]],
+        env: dict,
+        stages: set[str],
+    ):
+        self.job_dir = job_dir
+        self.stages = frozenset(stages)
+        self._compose_cmd = compose_cmd
+        self._prepare = prepare
+        self._cmd: list[str] | None = None
+        self._env = env
+        self._pending = set(stages)
+        self._lock = threading.Lock()
+        self._started = False
+        self._up_ok = False
+        self._stopped = False
+
+    def _compose(self, *args: str, **kwargs) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [*self._cmd, *args],
+            cwd=str(self.job_dir),
+            env=self._env,
+            **kwargs,
+        )
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("application instance was already torn down")
+            if not self._started:
+                # set first: a failed `up` may still leave containers to remove
+                self._started = True
+                compose_files = self._prepare()
+                self._cmd = self._compose_cmd + sum(
+                    [["-f", str(f)] for f in compose_files], []
+                )
+                # waits for the database healthcheck (app depends_on db)
+                self._up_ok = self._compose("up", "-d", "app").returncode == 0
+            if not self._up_ok:
+                raise RuntimeError("Could not start application containers")
+
+    def run(self, service: str) -> int:
+        """Run a one-off check container (smoke, zap) against the app."""
+        self._ensure_started()
+        return self._compose("run", "--rm", "--no-deps", service).returncode
+
+    def save_logs(self, dest: Path, service: str = "app"):
+        with open(dest, "w", encoding="utf-8") as out:
+            self._compose(
+                "logs", "--no-color", "--no-log-prefix", service,
+                stdout=out,
+                stderr=subprocess.DEVNULL,
+            )
+
+    def release(self, stage: str):
+        """`stage` is done with the app; the last one stops it."""
+        with self._lock:
+            self._pending.discard(stage)
+            last = not self._pending
+        if last:
+            self.stop()
+
+    def stop(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            # nothing was brought up when prepare failed
+            if self._cmd is not None:
+                self._compose("down", "-v", "--remove-orphans")
@@ -0,0 +1,220 @@
+import asyncio
+import codecs
+import json
+from pathlib import Path
+
+from config import (
+    WORKSPACES_DIR,
+    LOG_STREAM_POLL_INTERVAL,
+    LOG_STREAM_HISTORY_BYTES,
+    LOG_STREAM_READ_BYTES,
+    LOG_STREAM_SUBSCRIBER_QUEUE,
+    LOG_STREAM_KEEPALIVE,
+)
+from services import job_status_service
+
+STAGE_LOG_FILES = {
+    "SECRETS": ["secrets-dir.json", "secrets-git.json"],
+    "BUILD": ["build.log"],
+    "TEST": ["test.log"],
+    "SAST": ["sast.json"],
+    "SCA": ["sca.json"],
+    "PACKAGE": ["package.log"],
+    "SMOKE-TEST": ["smoke-test.log"],
+    "DAST": ["dast.json"],
+}
+
+# Report dirs a stage writes to before the worker normalizes them
+RUNNING_REPORT_DIRS = {
+    "SECRETS": ["secrets", "secrets-dir", "secrets-git"],
+}
+
+FINISHED = object()
+DROPPED = object()  # subscriber fell too far behind
+
+
+def expected_log_files(stage: str, pipeline: dict) -> list[str] | None:
+    """Log file names a stage produces, custom tools included."""
+    if stage == "SAST" and pipeline.get("sast_mode") == "custom":
+        ext = pipeline["sast_custom"].get("log_ext", "json")
+        return [f"SAST.{ext}"]
+
+    if stage == "SECRETS" and pipeline.get("secret_scan_mode") == "custom":
+        ext = pipeline["secret_custom"].get("log_ext", "json")
+        return [f"SECRETS.{ext}"]
+
+    return STAGE_LOG_FILES.get(stage)
+
+
+def _resolve_log_path(job_dir: Path, stage: str, filenames: list[str]) -> Path | None:
+    reports_dir = job_dir / "reports"
+
+    for dirname in RUNNING_REPORT_DIRS.get(stage, [stage.lower()]):
+        for filename in filenames:
+            path = reports_dir / dirname / filename
+            if path.exists():
+                return path
+
+    return None
+
+
+def _stage_status(job_id: str, stage: str) -> str | None:
+    _, body = job_status_service.get_job_status(job_id)
+    return body["execution"]["stages"].get(stage, {}).get("status")
+
+
+class LogTail:
+    """
+    Single reader of one stage log. New bytes are read from the saved
+    offset and fanned out to every subscriber; late subscribers get the
+    last LOG_STREAM_HISTORY_BYTES from memory instead of re-reading.
+    """
+
+    def __init__(self, job_id: str, stage: str, filenames: list[str]):
+        self.key = (job_id, stage)
+        self.job_dir = WORKSPACES_DIR / job_id
+        self.stage = stage
+        self.filenames = filenames
+
+        self.path: Path | None = None
+        self.offset = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.history: list[str] = []
+        self.history_bytes = 0
+        self.truncated = False
+        self.finished = False
+
+        self.subscribers: set[asyncio.Queue] = set()
+        self.task: asyncio.Task | None = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=LOG_STREAM_SUBSCRIBER_QUEUE + len(self.history) + 2)
+
+        if self.truncated:
+            queue.put_nowait("[... earlier output truncated ...]\n")
+        for chunk in self.history:
+            queue.put_nowait(chunk)
+        if self.finished:
+            queue.put_nowait(FINISHED)
+
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def _read_new(self) -> bytes:
+        if self.path is None:
+            self.path = _resolve_log_path(self.job_dir, self.stage, self.filenames)
+            if self.path is None:
+                return b""
+
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(LOG_STREAM_READ_BYTES)
+        except FileNotFoundError:
+            # moved by the worker (SECRETS normalization): resolve again
+            self.path = None
+            return b""
+
+        self.offset += len(data)
+        return data
+
+    def _publish(self, item):
+        if item is not FINISHED:
+            self.history.append(item)
+            self.history_bytes += len(item)
+            while self.history_bytes > LOG_STREAM_HISTORY_BYTES and len(self.history) > 1:
+                self.history_bytes -= len(self.history.pop(0))
+                self.truncated = True
+
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # too slow to keep up: drop it, the others keep streaming.
+                # Its oldest chunk makes room for telling it so.
+                self.subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(DROPPED)
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                data = await asyncio.to_thread(self._read_new)
+
+                if data:
+                    self._publish(self.decoder.decode(data))
+                    if len(data) == LOG_STREAM_READ_BYTES:
+                        continue  # more is already waiting
+                else:
+                    status = await asyncio.to_thread(_stage_status, *self.key)
+                    if status not in {"PENDING", "RUNNING"}:
+                        # one last read after the stage finished
+                        data = await asyncio.to_thread(self._read_new)
+                        if data:
+                            self._publish(self.decoder.decode(data))
+                            continue
+                        self.finished = True
+                        self._publish(FINISHED)
+                        return
+
+                await asyncio.sleep(LOG_STREAM_POLL_INTERVAL)
+        finally:
+            _tails.pop(self.key, None)
+
+
+_tails: dict[tuple[str, str], LogTail] = {}
+
+
+def _get_tail(job_id: str, stage: str, filenames: list[str]) -> LogTail:
+    tail = _tails.get((job_id, stage))
+    if tail is None:
+        tail = LogTail(job_id, stage, filenames)
+        _tails[tail.key] = tail
+    return tail
+
+
+def _sse(event: str, data: str) -> str:
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+
+async def stream_stage_log(job_id: str, stage: str, filenames: list[str]):
+    """
+    Server-sent events for a stage log: `log` chunks, then `end` (or
+    `error` when the client could not keep up and was dropped).
+    """
+    tail = _get_tail(job_id, stage, filenames)
+    queue = tail.subscribe()
+
+    if tail.task is None or tail.task.done():
+        _tails[tail.key] = tail
+        tail.task = asyncio.create_task(tail.run())
+
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), LOG_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                if queue not in tail.subscribers:
+                    return
+                yield ": keepalive\n\n"
+                continue
+
+            if item is DROPPED:
+                yield _sse("error", json.dumps({
+                    "stage": stage,
+                    "message": "client too slow, log stream dropped",
+                }))
+                return
+
+            if item is FINISHED:
+                status = await asyncio.to_thread(_stage_status, job_id, stage)
+                yield _sse("end", json.dumps({"stage": stage, "status": status}))
+                return
+
+            yield _sse("log", item)
+    finally:
+        tail.unsubscribe(queue)
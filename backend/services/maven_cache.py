@@ -0,0 +1,212 @@
+import fcntl
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from config import CACHES_DIR, HOST_CACHES_PATH, MAVEN_CACHE_MAX_BYTES
+
+MAVEN_CACHE_ROOT = CACHES_DIR / "maven"
+MAVEN_REPOSITORY_DIR = MAVEN_CACHE_ROOT / "repository"
+MAVEN_CACHE_LOCK = MAVEN_CACHE_ROOT / ".lock"
+MAVEN_LEASES_DIR = MAVEN_CACHE_ROOT / ".leases"
+
+# relatime only refreshes atime once the previous one is a day old, so an
+# artifact read since a lease began may look up to a day older than that.
+ATIME_RESOLUTION = 24 * 3600
+
+CONTAINER_REPOSITORY_DIR = "/home/runner/.m2/repository"
+
+# Maven 3.9 resolver: cross-process file locks per artifact so parallel
+# jobs can share one local repository, and refuse corrupted downloads.
+MAVEN_ARGS = " ".join([
+    f"-Dmaven.repo.local={CONTAINER_REPOSITORY_DIR}",
+    "-Daether.syncContext.named.factory=file-lock",
+    "-Daether.syncContext.named.nameMapper=file-gav",
+    "--strict-checksums",
+])
+
+ARTIFACT_SUFFIXES = (".jar", ".pom")
+
+
+def ensure_cache() -> Path:
+    """Create the shared repository, writable by the runner user (UID 10001)."""
+    MAVEN_REPOSITORY_DIR.mkdir(parents=True, exist_ok=True)
+    for path in (MAVEN_CACHE_ROOT, MAVEN_REPOSITORY_DIR):
+        try:
+            path.chmod(0o777)
+        except Exception as e:
+            print(f"Warning: Could not chmod {path}: {e}")
+    return MAVEN_REPOSITORY_DIR
+
+
+def host_repository_path() -> str:
+    """Repository path as seen by the docker daemon (for bind mounts)."""
+    return f"{HOST_CACHES_PATH}/maven/repository"
+
+
+def runner_docker_args() -> list[str]:
+    """`docker run` arguments mounting the shared repository into a runner."""
+    return [
+        "-v", f"{host_repository_path()}:{CONTAINER_REPOSITORY_DIR}",
+        "-e", f"MAVEN_ARGS={MAVEN_ARGS}",
+    ]
+
+
+@contextmanager
+def cache_lease():
+    """
+    Registered while a job may use the repository: a locked file under
+    .leases whose mtime is the lease start. Eviction leaves alone every
+    artifact version that may have been used since the oldest lease began.
+    Registration waits behind a running eviction pass.
+    """
+    ensure_cache()
+    MAVEN_LEASES_DIR.mkdir(exist_ok=True)
+    lease_path = MAVEN_LEASES_DIR / f"{os.getpid()}-{uuid.uuid4().hex}"
+
+    with open(MAVEN_CACHE_LOCK, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        try:
+            lease = open(lease_path, "w")
+            fcntl.flock(lease, fcntl.LOCK_EX)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    try:
+        yield
+    finally:
+        lease_path.unlink(missing_ok=True)
+        lease.close()
+
+
+# Batch mode transfer log line, e.g.
+# [INFO] Downloaded from central: https://.../foo-1.0.jar (12 kB at 85 kB/s)
+_DOWNLOADED_RE = re.compile(
+    r"Downloaded from [^:]+: (\S+) \((\d+(?:\.\d+)?) (B|kB|MB|GB)\b"
+)
+
+# maven prints sizes in decimal units
+_SIZE_UNITS = {"B": 1, "kB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3}
+
+
+def stage_stats(log_path: Path) -> dict | None:
+    """
+    Cache usage of one maven stage, read from its own log: a stage that
+    did not download anything was fully served from the cache (hit).
+    None when the stage left no log.
+    """
+    downloaded = 0
+    downloaded_bytes = 0
+
+    try:
+        with open(log_path, encoding="utf-8", errors="replace") as log:
+            for line in log:
+                match = _DOWNLOADED_RE.search(line)
+                if not match or not match.group(1).endswith(ARTIFACT_SUFFIXES):
+                    continue
+                downloaded += 1
+                downloaded_bytes += int(float(match.group(2)) * _SIZE_UNITS[match.group(3)])
+    except FileNotFoundError:
+        return None
+
+    return {
+        "hit": not downloaded,
+        "downloaded_artifacts": downloaded,
+        "downloaded_bytes": downloaded_bytes,
+    }
+
+
+def _artifact_versions() -> list[tuple[float, int, Path]]:
+    """(last used, size, dir) for every artifact version directory."""
+    versions = []
+
+    for dirpath, _, filenames in os.walk(MAVEN_REPOSITORY_DIR):
+        if not any(name.endswith(".pom") for name in filenames):
+            continue
+
+        last_used = 0.0
+        size = 0
+        for name in filenames:
+            try:
+                st = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            # relatime still refreshes atime at least once a day
+            last_used = max(last_used, st.st_atime, st.st_mtime)
+            size += st.st_size
+
+        versions.append((last_used, size, Path(dirpath)))
+
+    return versions
+
+
+def _oldest_lease_start() -> float | None:
+    """Start time of the oldest active lease; drops leases of dead workers."""
+    oldest = None
+
+    for lease_path in MAVEN_LEASES_DIR.glob("*"):
+        try:
+            with open(lease_path, "a") as lease:
+                started = os.fstat(lease.fileno()).st_mtime
+                try:
+                    fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    pass  # held: active lease
+                else:
+                    # registration is locked out while we run: nobody holds it
+                    lease_path.unlink(missing_ok=True)
+                    continue
+        except OSError:
+            continue
+
+        oldest = started if oldest is None else min(oldest, started)
+
+    return oldest
+
+
+def evict(max_bytes: int = MAVEN_CACHE_MAX_BYTES) -> int:
+    """
+    Drop least recently used artifact versions until the repository fits
+    in max_bytes. Runs under load: versions possibly used since the oldest
+    active lease began are kept, so the bound may be exceeded until they
+    age out. Returns freed bytes.
+    """
+    if not MAVEN_REPOSITORY_DIR.exists():
+        return 0
+
+    with open(MAVEN_CACHE_LOCK, "a") as lock:
+        # short exclusive section: new leases wait until this pass is done
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            oldest_lease = _oldest_lease_start()
+            cutoff = time.time() if oldest_lease is None else oldest_lease - ATIME_RESOLUTION
+
+            versions = _artifact_versions()
+            total = sum(size for _, size, _ in versions)
+            freed = 0
+
+            for last_used, size, version_dir in sorted(versions, key=lambda v: v[0]):
+                if total <= max_bytes or last_used >= cutoff:
+                    break
+
+                shutil.rmtree(version_dir, ignore_errors=True)
+                total -= size
+                freed += size
+
+                # remove now empty artifact / group directories
+                parent = version_dir.parent
+                while parent != MAVEN_REPOSITORY_DIR:
+                    try:
+                        parent.rmdir()
+                    except OSError:
+                        break
+                    parent = parent.parent
+
+            return freed
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,156 @@
+import fcntl
+import hashlib
+import json
+import shutil
+import subprocess
+import time
+import uuid
+from pathlib import Path
+
+from config import CACHES_DIR, HOST_CACHES_PATH
+
+TEMPLATES_ROOT = CACHES_DIR / "postgres-templates"
+
+# printed by the official image's entrypoint once initdb + setup are done
+INIT_DONE = "PostgreSQL init process complete; ready for start up."
+
+# bump when the way templates are built changes
+TEMPLATE_FORMAT = 1
+
+INIT_TIMEOUT = 300   # seconds, includes pulling the image
+STOP_TIMEOUT = 60    # seconds for a clean shutdown (checkpoint)
+
+
+def template_key(db: dict) -> str:
+    """
+    Everything baked into the data directory at initdb time. An existing
+    PGDATA skips the entrypoint's setup, so credentials are part of the key.
+    """
+    parts = {
+        "format": TEMPLATE_FORMAT,
+        "image": db.get("image", "postgres:15"),
+        "name": db.get("name", "app"),
+        "user": db.get("user", "postgres"),
+        "password": db.get("password", "postgres"),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _container_logs(name: str) -> str:
+    proc = subprocess.run(
+        ["docker", "logs", name],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    return proc.stdout + proc.stderr
+
+
+def _is_running(name: str) -> bool:
+    proc = subprocess.run(
+        ["docker", "inspect", "-f", "{{.State.Running}}", name],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    return proc.stdout.strip() == "true"
+
+
+def _build(db: dict, target: Path):
+    """initdb once with the job's image and credentials, then shut down cleanly."""
+    partial = target.with_name(f"{target.name}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    partial.mkdir(parents=True)
+
+    name = f"pipelinex-pg-template-{uuid.uuid4().hex[:12]}"
+    try:
+        subprocess.run(
+            [
+                "docker", "run", "-d",
+                "--name", name,
+                "--network", "none",
+                "-e", f"POSTGRES_DB={db.get('name', 'app')}",
+                "-e", f"POSTGRES_USER={db.get('user', 'postgres')}",
+                "-e", f"POSTGRES_PASSWORD={db.get('password', 'postgres')}",
+                "-v", f"{HOST_CACHES_PATH}/postgres-templates/{partial.name}:/var/lib/postgresql/data",
+                db.get("image", "postgres:15"),
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            timeout=INIT_TIMEOUT,
+        )
+
+        deadline = time.monotonic() + INIT_TIMEOUT
+        while INIT_DONE not in _container_logs(name):
+            if not _is_running(name):
+                raise RuntimeError("postgres exited during initdb")
+            if time.monotonic() > deadline:
+                raise RuntimeError("postgres initdb timed out")
+            time.sleep(0.5)
+
+        # SIGTERM: smart shutdown, the data directory is left consistent
+        subprocess.run(
+            ["docker", "stop", "-t", str(STOP_TIMEOUT), name],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            timeout=STOP_TIMEOUT + 30,
+        )
+        if (partial / "postmaster.pid").exists():
+            raise RuntimeError("postgres did not shut down cleanly")
+    except Exception:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    finally:
+        subprocess.run(
+            ["docker", "rm", "-f", name],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    partial.rename(target)
+
+
+def ensure_template(db: dict) -> Path:
+    """Initialized PGDATA for this database config, built on first use."""
+    TEMPLATES_ROOT.mkdir(parents=True, exist_ok=True)
+    target = TEMPLATES_ROOT / template_key(db)
+
+    if (target / "PG_VERSION").exists():
+        return target
+
+    # concurrent jobs wait for the one building the template
+    with open(target.with_suffix(".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not (target / "PG_VERSION").exists():
+                _build(db, target)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    return target
+
+
+def clone_into(db: dict, dest: Path) -> bool:
+    """
+    Give a job its own copy of the template data directory (copy-on-write
+    where the filesystem supports reflinks). Returns False when no
+    template can be used, the database then initializes from scratch.
+    """
+    if db.get("driver", "postgresql") != "postgresql":
+        return False
+
+    try:
+        template = ensure_template(db)
+        shutil.rmtree(dest, ignore_errors=True)
+        # -a keeps the postgres owner and the 0700 mode initdb requires
+        subprocess.run(
+            ["cp", "-a", "--reflink=auto", str(template), str(dest)],
+            check=True,
+            timeout=300,
+        )
+    except Exception as e:
+        print(f"Warning: could not use a postgres template, initializing from scratch: {e}")
+        shutil.rmtree(dest, ignore_errors=True)
+        return False
+
+    return True
@@ -0,0 +1,135 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from config import UPLOAD_CHUNK_BYTES
+
+ARCHIVES_DIRNAME = "archives"
+STALE_PARTIAL_SECONDS = 3600
+
+
+def reports_fingerprint(reports_dir: Path) -> str:
+    """
+    Fingerprint of the reports tree (relative path, size, mtime of every
+    file). Changes whenever a report is added, removed or rewritten.
+    """
+    digest = hashlib.sha256()
+
+    for path in sorted(p for p in reports_dir.rglob("*") if p.is_file()):
+        st = path.stat()
+        digest.update(
+            f"{path.relative_to(reports_dir)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode()
+        )
+
+    return digest.hexdigest()[:32]
+
+
+def _iter_report_files(reports_dir: Path):
+    for path in sorted(reports_dir.rglob("*")):
+        if path.is_file():
+            yield path, path.relative_to(reports_dir)
+
+
+def build_report_archive(job_dir: Path) -> tuple[Path, str]:
+    """
+    Return (archive path, fingerprint) for the job reports, building the
+    ZIP only when no archive exists for the current fingerprint. Writes
+    go to a partial file renamed into place, older archives are removed.
+    """
+    reports_dir = job_dir / "reports"
+    archives_dir = job_dir / ARCHIVES_DIRNAME
+    archives_dir.mkdir(exist_ok=True)
+
+    fingerprint = reports_fingerprint(reports_dir)
+    archive = archives_dir / f"reports-{fingerprint}.zip"
+
+    if not archive.exists():
+        fd, partial = tempfile.mkstemp(
+            dir=archives_dir, prefix=".reports-", suffix=".partial"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f, \
+                    zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zipf:
+                for path, arcname in _iter_report_files(reports_dir):
+                    zipf.write(path, arcname)
+
+            os.replace(partial, archive)
+        except Exception:
+            Path(partial).unlink(missing_ok=True)
+            raise
+
+    _remove_stale_archives(archives_dir, keep=archive)
+    return archive, fingerprint
+
+
+def _remove_stale_archives(archives_dir: Path, keep: Path):
+    now = time.time()
+
+    for path in archives_dir.iterdir():
+        if path == keep:
+            continue
+
+        if path.name.endswith(".partial"):
+            # only partials left behind by a crashed build
+            if now - path.stat().st_mtime < STALE_PARTIAL_SECONDS:
+                continue
+
+        path.unlink(missing_ok=True)
+
+
+class _ChunkWriter(io.RawIOBase):
+    """Unseekable sink collecting what zipfile writes."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_report_zip(reports_dir: Path):
+    """Generate a ZIP of the reports on the fly, without any temp file."""
+    sink = _ChunkWriter()
+
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path, arcname in _iter_report_files(reports_dir):
+            with open(path, "rb") as src, zipf.open(str(arcname), "w") as dst:
+                while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                    dst.write(chunk)
+                    if data := sink.drain():
+                        yield data
+
+            if data := sink.drain():
+                yield data
+
+    if data := sink.drain():
+        yield data
+
+
+def cleanup_orphaned_temp_archives(max_age_seconds: int = STALE_PARTIAL_SECONDS):
+    """
+    Remove report ZIPs the previous download endpoint left in the temp
+    directory (NamedTemporaryFile(delete=False, suffix=".zip")).
+    """
+    tmp_dir = Path(tempfile.gettempdir())
+    now = time.time()
+
+    for path in tmp_dir.glob("tmp*.zip"):
+        try:
+            if now - path.stat().st_mtime > max_age_seconds:
+                path.unlink()
+        except OSError:
+            continue
@@ -0,0 +1,280 @@
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+
+from config import (
+    HOST_WORKSPACES_PATH,
+    RUNNER_POOL_MIN,
+    RUNNER_POOL_MAX,
+    RUNNER_POOL_MAX_LEASES,
+)
+from services import maven_cache, semgrep_rules, trivy_db
+from utils import docker_api
+from utils.redis_client import get_redis
+
+POOL_PREFIX = "pipelinex:runner-pool"
+METRICS_KEY = f"{POOL_PREFIX}:metrics"
+LATENCIES_KEY = f"{POOL_PREFIX}:lease-ms"
+LATENCY_SAMPLES = 200
+
+RUNNER_USER = "10001:10001"
+RUNNER_HOME = "/home/runner"
+
+# Top-level entries of $HOME that are bind mounts, kept by the scrub
+# (the maven repository is mounted below .m2)
+_HOME_KEEP = "! -name workspaces ! -name .m2"
+
+# Kill everything a previous job left behind (background JVMs, ...), wipe
+# scratch space and put $HOME back to the image's state: a job can leave
+# ~/.bashrc, ~/.profile, ~/.gitconfig, ~/.m2/settings.xml or tools in
+# ~/bin (first on PATH) that the next job's `bash -lc` stages would pick
+# up. Runs as root; processes are found through /proc (the image has no
+# procps) and the scrub fails when /proc is unreadable or anything but a
+# zombie survives the kill. Otherwise the exit status is the one of the
+# $HOME reset; a runner that could not be reset is not pooled again.
+# PID 1 keeps the container alive.
+SCRUB_CMD = (
+    '[ -r /proc/1/status ] || exit 1; '
+    'for d in /proc/[0-9]*; do p=${d#/proc/}; '
+    '[ "$p" -ne 1 ] && [ "$p" -ne $$ ] && kill -9 "$p" 2>/dev/null; '
+    'done; '
+    'sleep 0.5; '
+    'for d in /proc/[0-9]*; do p=${d#/proc/}; '
+    '{ [ "$p" -eq 1 ] || [ "$p" -eq $$ ]; } && continue; '
+    'state=$(sed -n "s/^State:[[:space:]]*//p" "$d/status" 2>/dev/null); '
+    'case "$state" in ""|Z*) ;; *) exit 1 ;; esac; '
+    'done; '
+    'rm -rf /tmp/* /tmp/.[!.]* /var/tmp/* /var/tmp/.[!.]* /dev/shm/* 2>/dev/null; '
+    f'find {RUNNER_HOME} -mindepth 1 -maxdepth 1 {_HOME_KEEP} -exec rm -rf {{}} + && '
+    f'find {RUNNER_HOME}/.m2 -mindepth 1 -maxdepth 1 ! -name repository -exec rm -rf {{}} + && '
+    f'cp -a /etc/skel/. {RUNNER_HOME}/ && '
+    f'mkdir {RUNNER_HOME}/bin && '
+    f'git config --file {RUNNER_HOME}/.gitconfig --add safe.directory "*" && '
+    f'find {RUNNER_HOME} -mindepth 1 -maxdepth 1 {_HOME_KEEP} -exec chown -R {RUNNER_USER} {{}} +'
+)
+
+
+@dataclass
+class RunnerLease:
+    container: str
+    image: str
+    warm: bool
+    lease_ms: int
+
+
+def _idle_key(image: str) -> str:
+    return f"{POOL_PREFIX}:{image}:idle"
+
+
+def _members_key(image: str) -> str:
+    return f"{POOL_PREFIX}:{image}:members"
+
+
+def _leases_key(image: str) -> str:
+    return f"{POOL_PREFIX}:{image}:leases"
+
+
+def _start_container(image: str) -> str:
+    """
+    Start a job-independent runner container. Job specific paths are
+    passed per `docker exec`, the whole workspaces dir is mounted.
+    """
+    name = f"runner-pool-{uuid.uuid4().hex[:12]}"
+    maven_cache.ensure_cache()
+    trivy_db.ensure_cache()
+    semgrep_rules.ensure_cache()
+
+    subprocess.run(
+        [
+            "docker", "run", "-d",
+            "--name", name,
+            "--label", "pipelinex.runner-pool=1",
+            "-u", RUNNER_USER,  # Run as non-root user
+
+            # Mount host workspaces directory
+            "-v", f"{HOST_WORKSPACES_PATH}:/home/runner/workspaces",
+
+            # Shared maven local repository
+            *maven_cache.runner_docker_args(),
+
+            # Pre-downloaded trivy DB (read-only)
+            *trivy_db.runner_docker_args(),
+
+            # Cached semgrep rule packs (read-only)
+            *semgrep_rules.runner_docker_args(),
+
+            "-w", "/home/runner",
+            image,
+            "tail", "-f", "/dev/null",  # Keep container running
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    # Fix Git safe.directory issue (Git 2.35.2+ security feature).
+    # Pooled runners serve every job, so all workspace repos are trusted.
+    try:
+        docker_api.exec_run(
+            name,
+            ["git", "config", "--global", "--add", "safe.directory", "*"],
+        )
+    except Exception as e:
+        # Don't fail if git config fails
+        print(f"Warning: could not configure git in {name}: {e}")
+
+    return name
+
+
+def _remove_container(name: str):
+    subprocess.run(
+        ["docker", "rm", "-f", name],
+        check=False,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _is_running(name: str) -> bool:
+    try:
+        return docker_api.container_running(name)
+    except Exception:
+        return False
+
+
+def _scrub(name: str) -> bool:
+    try:
+        return docker_api.exec_run(
+            name, ["bash", "-c", SCRUB_CMD], user="root", on_output=None
+        ) == 0
+    except Exception:
+        return False
+
+
+def _record_lease(lease: RunnerLease):
+    r = get_redis()
+    pipe = r.pipeline()
+    pipe.hincrby(METRICS_KEY, "leases_total", 1)
+    pipe.hincrby(METRICS_KEY, "warm_leases" if lease.warm else "cold_leases", 1)
+    pipe.hincrby(METRICS_KEY, "lease_ms_total", lease.lease_ms)
+    pipe.lpush(LATENCIES_KEY, lease.lease_ms)
+    pipe.ltrim(LATENCIES_KEY, 0, LATENCY_SAMPLES - 1)
+    pipe.execute()
+
+
+def lease(image: str) -> RunnerLease:
+    """
+    Take a warm runner for `image` from the pool, or start one when the
+    pool is empty. Falls back to an unpooled container if redis is down.
+    """
+    started = time.monotonic()
+    container = None
+    warm = False
+
+    try:
+        r = get_redis()
+
+        while container is None:
+            candidate = r.lpop(_idle_key(image))
+            if candidate is None:
+                break
+
+            if _is_running(candidate):
+                container = candidate
+                warm = True
+            else:
+                r.srem(_members_key(image), candidate)
+                r.hdel(_leases_key(image), candidate)
+                _remove_container(candidate)
+
+        if container is None:
+            container = _start_container(image)
+
+            members = _members_key(image)
+            r.sadd(members, container)
+            if r.scard(members) > RUNNER_POOL_MAX:
+                # pool full: this one is discarded on release
+                r.srem(members, container)
+
+        r.hincrby(_leases_key(image), container, 1)
+
+    except Exception as e:
+        print(f"Warning: runner pool unavailable, starting unpooled runner: {e}")
+        if container is None:
+            container = _start_container(image)
+
+    result = RunnerLease(
+        container=container,
+        image=image,
+        warm=warm,
+        lease_ms=int((time.monotonic() - started) * 1000),
+    )
+
+    try:
+        _record_lease(result)
+    except Exception:
+        pass
+
+    return result
+
+
+def release(runner: RunnerLease):
+    """
+    Scrub and return a runner to the pool. Containers that are not pool
+    members, failed the scrub or served RUNNER_POOL_MAX_LEASES jobs are
+    removed instead.
+    """
+    try:
+        r = get_redis()
+        pooled = r.sismember(_members_key(runner.image), runner.container)
+        leases = int(r.hget(_leases_key(runner.image), runner.container) or 0)
+
+        if pooled and leases < RUNNER_POOL_MAX_LEASES and _scrub(runner.container):
+            r.rpush(_idle_key(runner.image), runner.container)
+            return
+
+        r.srem(_members_key(runner.image), runner.container)
+        r.hdel(_leases_key(runner.image), runner.container)
+    except Exception as e:
+        print(f"Warning: could not return runner {runner.container} to pool: {e}")
+
+    _remove_container(runner.container)
+
+
+def refill(image: str):
+    """Start runners until RUNNER_POOL_MIN are idle for `image`."""
+    r = get_redis()
+
+    while r.llen(_idle_key(image)) < RUNNER_POOL_MIN:
+        members = _members_key(image)
+        if r.scard(members) >= RUNNER_POOL_MAX:
+            return
+
+        container = _start_container(image)
+        r.sadd(members, container)
+        r.rpush(_idle_key(image), container)
+
+
+def metrics() -> dict:
+    """Lease counters and latency percentiles over the recent leases."""
+    r = get_redis()
+    counters = {k: int(v) for k, v in r.hgetall(METRICS_KEY).items()}
+    samples = sorted(int(v) for v in r.lrange(LATENCIES_KEY, 0, -1))
+
+    def percentile(p: float):
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    leases_total = counters.get("leases_total", 0)
+
+    return {
+        "leases_total": leases_total,
+        "warm_leases": counters.get("warm_leases", 0),
+        "cold_leases": counters.get("cold_leases", 0),
+        "lease_ms_avg": (
+            counters.get("lease_ms_total", 0) // leases_total if leases_total else None
+        ),
+        "lease_ms_p50": percentile(0.50),
+        "lease_ms_p95": percentile(0.95),
+    }
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from config import DATA_DIR
+
+# Last fully scanned commit + findings of every repository (git mode)
+BASELINES_DIR = DATA_DIR / "secret-baselines"
+
+FINDINGS_FILE = "secrets-git.json"
+
+# What a baseline keeps of a gitleaks finding: enough to recognize and
+# report it again, never the secret itself (Secret / Match / Line) nor
+# the commit author
+BASELINE_FIELDS = (
+    "RuleID",
+    "Description",
+    "File",
+    "StartLine",
+    "EndLine",
+    "StartColumn",
+    "EndColumn",
+    "Commit",
+    "Date",
+    "Fingerprint",
+)
+
+
+@dataclass
+class ScanPlan:
+    repository: str
+    head: str
+    scanner: str            # runner image id, rules ship with the image
+    base: str | None = None  # None: full history scan
+    reason: str = "full"
+
+    @property
+    def log_opts(self) -> str:
+        # both modes cover HEAD's history only, never the other refs
+        return f"{self.base}..{self.head}" if self.base else self.head
+
+
+def _baseline_path(repository: str) -> Path:
+    digest = hashlib.sha256(repository.encode("utf-8")).hexdigest()[:16]
+    return BASELINES_DIR / f"{repository.replace('/', '-')}-{digest}.json"
+
+
+def load_baseline(repository: str) -> dict | None:
+    try:
+        return json.loads(_baseline_path(repository).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _git(source_dir: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        ["git", "-C", str(source_dir), *args],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def plan_scan(
+    source_dir: Path,
+    repository: str,
+    scanner: str,
+    *,
+    full: bool = False,
+) -> ScanPlan:
+    """
+    Scan only the commits after the stored watermark. Falls back to the
+    full history when asked to, when the scanner (rules) changed or
+    when the watermark is no longer an ancestor of HEAD (force push).
+    """
+    head = _git(source_dir, "rev-parse", "HEAD").stdout.strip()
+    plan = ScanPlan(repository=repository, head=head, scanner=scanner)
+    baseline = load_baseline(repository)
+
+    if full:
+        plan.reason = "full rescan requested"
+    elif not baseline:
+        plan.reason = "no baseline"
+    elif baseline.get("scanner") != scanner:
+        plan.reason = "scanner changed"
+    elif baseline["commit"] == head:
+        plan.base, plan.reason = head, "no new commits"
+    elif _git(source_dir, "merge-base", "--is-ancestor", baseline["commit"], head).returncode == 0:
+        plan.base, plan.reason = baseline["commit"], "incremental"
+    else:
+        plan.reason = "history rewritten"
+
+    return plan
+
+
+def _read_findings(path: Path) -> list[dict]:
+    try:
+        findings = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return findings if isinstance(findings, list) else []
+
+
+def _fingerprint(finding: dict) -> str:
+    return finding.get("Fingerprint") or json.dumps(finding, sort_keys=True)
+
+
+def _baseline_entry(finding: dict) -> dict:
+    entry = {field: finding[field] for field in BASELINE_FIELDS if field in finding}
+    entry["Fingerprint"] = _fingerprint(finding)
+    return entry
+
+
+def merge_and_record(report_dir: Path, plan: ScanPlan) -> dict:
+    """
+    Merge the findings of an incremental scan into the stored baseline,
+    rewrite the stage report with the complete findings and move the
+    watermark to HEAD. Returns the scan summary for result.json.
+
+    Findings carried over from earlier scans are reported with the
+    metadata kept in the baseline only.
+    """
+    findings_path = report_dir / FINDINGS_FILE
+    scanned = _read_findings(findings_path)
+
+    baseline = load_baseline(plan.repository) if plan.base else None
+    findings = [_baseline_entry(f) for f in baseline["findings"]] if baseline else []
+
+    known = {_fingerprint(f) for f in findings}
+    new = [f for f in scanned if _fingerprint(f) not in known]
+    findings.extend(new)
+
+    tmp = findings_path.with_name(f".{FINDINGS_FILE}.tmp")
+    tmp.write_text(json.dumps(findings, indent=2), encoding="utf-8")
+    os.replace(tmp, findings_path)
+
+    BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+    target = _baseline_path(plan.repository)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+    tmp.write_text(
+        json.dumps({
+            "repository": plan.repository,
+            "commit": plan.head,
+            "scanner": plan.scanner,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "findings": [_baseline_entry(f) for f in findings],
+        }),
+        encoding="utf-8",
+    )
+    os.replace(tmp, target)
+
+    return {
+        "mode": "incremental" if plan.base else "full",
+        "reason": plan.reason,
+        "range": plan.log_opts,
+        "new_findings": len(new),
+        "total_findings": len(findings),
+    }
@@ -0,0 +1,111 @@
+import fcntl
+import hashlib
+import os
+import urllib.request
+from pathlib import Path
+
+from config import CACHES_DIR, HOST_CACHES_PATH, SEMGREP_RULESET
+
+SEMGREP_CACHE_ROOT = CACHES_DIR / "semgrep"
+SEMGREP_CACHE_LOCK = SEMGREP_CACHE_ROOT / ".lock"
+CURRENT_LINK = SEMGREP_CACHE_ROOT / "current"
+
+# same endpoint `semgrep --config=p/...` downloads the rules from
+REGISTRY_URL = "https://semgrep.dev/c/"
+
+# read-only in runners
+CONTAINER_CACHE_ROOT = "/opt/semgrep-rules"
+
+RULES_PREFIX = "rules-"
+KEEP_VERSIONS = 3
+
+
+def ensure_cache() -> Path:
+    SEMGREP_CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+    return SEMGREP_CACHE_ROOT
+
+
+def runner_docker_args() -> list[str]:
+    """`docker run` arguments mounting the rule packs into a runner."""
+    return ["-v", f"{HOST_CACHES_PATH}/semgrep:{CONTAINER_CACHE_ROOT}:ro"]
+
+
+def current_version() -> str | None:
+    """Content hash of the rule pack SAST uses, None before the first refresh."""
+    try:
+        target = os.readlink(CURRENT_LINK)
+    except OSError:
+        return None
+    if not (SEMGREP_CACHE_ROOT / target).is_file():
+        return None
+    return target.removeprefix(RULES_PREFIX).removesuffix(".yml")
+
+
+def runner_exec_env(version: str | None) -> list[str]:
+    """
+    Exec environment pointing sast.sh at one rule pack version.
+    Empty before the first refresh: semgrep then uses the registry.
+    """
+    if not version:
+        return []
+
+    return [
+        f"SEMGREP_RULES_FILE={CONTAINER_CACHE_ROOT}/{RULES_PREFIX}{version}.yml",
+        f"SEMGREP_RULES_VERSION={SEMGREP_RULESET}@{version}",
+    ]
+
+
+def _prune_versions(current: str):
+    packs = sorted(
+        SEMGREP_CACHE_ROOT.glob(f"{RULES_PREFIX}*.yml"),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for path in packs[:-KEEP_VERSIONS]:
+        if path.name != current:
+            path.unlink(missing_ok=True)
+
+
+def refresh(ruleset: str = SEMGREP_RULESET) -> str | None:
+    """
+    Download the rule pack from the registry. Packs are content
+    addressed (rules-<sha>.yml), an unchanged pack keeps its version.
+    Returns the current version, None when another refresh is running.
+    """
+    ensure_cache()
+
+    with open(SEMGREP_CACHE_LOCK, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        try:
+            request = urllib.request.Request(
+                REGISTRY_URL + ruleset,
+                headers={"User-Agent": "pipelinex-semgrep-cache"},
+            )
+            with urllib.request.urlopen(request, timeout=120) as response:
+                rules = response.read()
+
+            if b"rules:" not in rules[:4096]:
+                raise RuntimeError(f"Registry returned no rules for {ruleset}")
+
+            version = hashlib.sha256(rules).hexdigest()[:16]
+            name = f"{RULES_PREFIX}{version}.yml"
+            target = SEMGREP_CACHE_ROOT / name
+
+            if not target.exists():
+                tmp = SEMGREP_CACHE_ROOT / f".{name}.tmp"
+                tmp.write_bytes(rules)
+                tmp.chmod(0o644)
+                os.replace(tmp, target)
+
+            tmp_link = SEMGREP_CACHE_ROOT / f".current.{version}"
+            tmp_link.unlink(missing_ok=True)
+            os.symlink(name, tmp_link)
+            os.replace(tmp_link, CURRENT_LINK)
+
+            _prune_versions(name)
+            return version
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
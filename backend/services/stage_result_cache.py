@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+import uuid
+from pathlib import Path
+
+from config import CACHES_DIR, STAGE_RESULT_CACHE_TTL
+from utils import workspace_manifest
+
+RESULTS_DIR = CACHES_DIR / "stage-results"
+ENTRY_META = ".cache-meta.json"
+
+# Bump when the way results are produced changes outside the stage
+# scripts (e.g. the SECRETS output normalization in job_execution)
+CACHE_FORMAT = 1
+
+# Scanners only read the source: their output is a function of the
+# key. Build / test / runtime stages are never cached.
+CACHEABLE_STAGES = {"SECRETS", "SAST", "SCA"}
+
+_CUSTOM_MODE = {
+    "SECRETS": "secret_scan_mode",
+    "SAST": "sast_mode",
+}
+
+
+def is_cacheable(stage: str, pipeline: dict) -> bool:
+    if stage not in CACHEABLE_STAGES:
+        return False
+    # user supplied tools may do anything, never reuse their results
+    mode_field = _CUSTOM_MODE.get(stage)
+    return not (mode_field and pipeline.get(mode_field) == "custom")
+
+
+def source_digest(job_dir: Path) -> str:
+    """
+    Deterministic hash of source/: sorted relative paths and contents.
+    .git is left out (git history is keyed by its HEAD commit instead).
+    The file list comes from the admission manifest when present, so
+    build output written meanwhile never changes the digest.
+    """
+    source_dir = job_dir / "source"
+    manifest_path = job_dir / workspace_manifest.MANIFEST_FILE
+
+    if manifest_path.exists():
+        manifest = workspace_manifest.WorkspaceManifest.load(manifest_path)
+    else:
+        manifest = workspace_manifest.scan(source_dir)
+
+    digest = hashlib.sha256()
+    for entry in sorted(manifest.files, key=lambda e: e.path):
+        if entry.path == ".git" or entry.path.startswith(".git/"):
+            continue
+
+        path = source_dir / entry.path
+        digest.update(entry.path.encode("utf-8") + b"\0")
+
+        if entry.is_symlink:
+            digest.update(b"L" + os.readlink(path).encode("utf-8"))
+        else:
+            with open(path, "rb") as f:
+                digest.update(b"F" + hashlib.file_digest(f, "sha256").digest())
+
+    return digest.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def image_digest(image: str) -> str:
+    """Image id of the local runner image; a rebuilt / pulled image changes it."""
+    return subprocess.check_output(
+        ["docker", "image", "inspect", "-f", "{{.Id}}", image],
+        text=True,
+        timeout=30,
+    ).strip()
+
+
+def git_head(source_dir: Path) -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "-C", str(source_dir), "rev-parse", "HEAD"],
+            text=True,
+            timeout=30,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (subprocess.SubprocessError, OSError):
+        return None
+
+
+def stage_key(stage: str, **parts: str) -> str:
+    payload = json.dumps(
+        {"format": CACHE_FORMAT, "stage": stage, **parts},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_dir(key: str) -> Path:
+    return RESULTS_DIR / key[:2] / key
+
+
+def _read_meta(entry: Path) -> dict | None:
+    try:
+        return json.loads((entry / ENTRY_META).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _expired(meta: dict) -> bool:
+    return time.time() - meta.get("created", 0) > STAGE_RESULT_CACHE_TTL
+
+
+def restore(key: str, report_dir: Path) -> dict | None:
+    """
+    Copy a cached stage report into `report_dir`.
+    Returns the entry metadata on a hit, None on a miss or expired entry.
+    """
+    entry = _entry_dir(key)
+
+    meta = _read_meta(entry)
+    if meta is None or _expired(meta):
+        return None
+
+    shutil.copytree(
+        entry,
+        report_dir,
+        dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns(ENTRY_META),
+    )
+    return meta
+
+
+def store(key: str, report_dir: Path, job_id: str):
+    """
+    Publish `report_dir` under `key`; the first writer wins. An expired
+    entry is replaced instead of blocking the key until the next prune.
+    """
+    entry = _entry_dir(key)
+    if entry.exists():
+        meta = _read_meta(entry)
+        if meta is not None and not _expired(meta):
+            return
+
+        # one rename: readers see the old entry or none, never half of it
+        stale = entry.parent / f".{key}.{uuid.uuid4().hex}"
+        try:
+            os.rename(entry, stale)
+        except OSError:
+            pass  # replaced by another job meanwhile
+        shutil.rmtree(stale, ignore_errors=True)
+
+    tmp = entry.parent / f".{key}.{uuid.uuid4().hex}"
+
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copytree(report_dir, tmp)
+        (tmp / ENTRY_META).write_text(
+            json.dumps({"job_id": job_id, "created": time.time()}),
+            encoding="utf-8",
+        )
+        os.rename(tmp, entry)
+    except OSError:
+        # lost the race against another job, or the cache is unusable
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def prune(max_age: int = STAGE_RESULT_CACHE_TTL) -> int:
+    """Remove expired entries and leftovers of interrupted stores."""
+    if not RESULTS_DIR.is_dir():
+        return 0
+
+    removed = 0
+    deadline = time.time() - max_age
+
+    for bucket in RESULTS_DIR.iterdir():
+        if not bucket.is_dir():
+            continue
+        for entry in bucket.iterdir():
+            meta_path = entry / ENTRY_META
+            try:
+                created = (
+                    json.loads(meta_path.read_text(encoding="utf-8"))["created"]
+                    if not entry.name.startswith(".")
+                    else entry.stat().st_mtime
+                )
+            except (OSError, ValueError, KeyError):
+                created = 0
+
+            if created < deadline:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+
+    return removed
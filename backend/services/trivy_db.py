@@ -0,0 +1,151 @@
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import CACHES_DIR, HOST_CACHES_PATH, TRIVY_DB_KEEP_VERSIONS
+
+TRIVY_CACHE_ROOT = CACHES_DIR / "trivy"
+TRIVY_CACHE_LOCK = TRIVY_CACHE_ROOT / ".lock"
+CURRENT_LINK = TRIVY_CACHE_ROOT / "current"
+
+# read-only in runners: job code must not be able to alter the DB
+CONTAINER_CACHE_ROOT = "/opt/trivy-cache"
+
+VERSION_PREFIX = "db-"
+
+
+def ensure_cache() -> Path:
+    TRIVY_CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+    return TRIVY_CACHE_ROOT
+
+
+def runner_docker_args() -> list[str]:
+    """`docker run` arguments mounting the DB versions into a runner."""
+    return ["-v", f"{HOST_CACHES_PATH}/trivy:{CONTAINER_CACHE_ROOT}:ro"]
+
+
+def current_version() -> str | None:
+    """Directory name of the DB version new scans use, None before the first refresh."""
+    try:
+        target = os.readlink(CURRENT_LINK)
+    except OSError:
+        return None
+    return target if (TRIVY_CACHE_ROOT / target / "db" / "trivy.db").exists() else None
+
+
+def runner_exec_env(version: str | None) -> list[str]:
+    """
+    Exec environment pinning a scan to one DB version (see
+    current_version), so a refresh during the scan does not affect it.
+    Empty before the first refresh: trivy then downloads the DB itself.
+    """
+    if not version:
+        return []
+
+    return [
+        f"TRIVY_CACHE_DIR={CONTAINER_CACHE_ROOT}/{version}",
+        "TRIVY_SKIP_DB_UPDATE=true",
+        "TRIVY_SKIP_JAVA_DB_UPDATE=true",
+        # scan results are not cached in the (read-only) cache dir
+        "TRIVY_CACHE_BACKEND=memory",
+    ]
+
+
+def db_info(version: str | None = None) -> dict | None:
+    """Version and age of a DB version (defaults to current), for reports."""
+    version = version or current_version()
+    if not version:
+        return None
+
+    try:
+        meta = json.loads(
+            (TRIVY_CACHE_ROOT / version / "db" / "metadata.json").read_text(encoding="utf-8")
+        )
+    except (OSError, ValueError):
+        return None
+
+    info = {
+        "cache_version": version,
+        "schema_version": meta.get("Version"),
+        "updated_at": meta.get("UpdatedAt"),
+        "downloaded_at": meta.get("DownloadedAt"),
+        "next_update": meta.get("NextUpdate"),
+    }
+
+    try:
+        updated = datetime.fromisoformat(meta["UpdatedAt"].replace("Z", "+00:00"))
+        info["age_hours"] = round(
+            (datetime.now(timezone.utc) - updated).total_seconds() / 3600, 1
+        )
+    except (KeyError, ValueError, AttributeError):
+        info["age_hours"] = None
+
+    return info
+
+
+def _prune_versions(keep: int):
+    """Drop old versions; the newest `keep` stay for scans still using them."""
+    current = current_version()
+    versions = sorted(
+        p for p in TRIVY_CACHE_ROOT.iterdir()
+        if p.is_dir() and p.name.startswith(VERSION_PREFIX)
+    )
+    for path in versions[:-keep]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def refresh(image: str, keep: int = TRIVY_DB_KEEP_VERSIONS) -> str | None:
+    """
+    Download a fresh DB into a new version directory with the runner
+    image's trivy, then switch `current` to it atomically.
+    Returns the new version, None when another refresh is running.
+    """
+    ensure_cache()
+
+    with open(TRIVY_CACHE_LOCK, "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        try:
+            version = f"{VERSION_PREFIX}{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+            target = TRIVY_CACHE_ROOT / version
+            target.mkdir()
+            target.chmod(0o777)  # written by the runner user (UID 10001)
+
+            try:
+                subprocess.run(
+                    [
+                        "docker", "run", "--rm",
+                        "-u", "10001:10001",
+                        "-v", f"{HOST_CACHES_PATH}/trivy/{version}:/trivy-cache",
+                        image,
+                        "trivy", "image", "--download-db-only",
+                        "--cache-dir", "/trivy-cache",
+                        "--no-progress",
+                    ],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    timeout=900,
+                )
+                if not (target / "db" / "trivy.db").exists():
+                    raise RuntimeError("trivy did not produce db/trivy.db")
+            except Exception:
+                shutil.rmtree(target, ignore_errors=True)
+                raise
+
+            tmp_link = TRIVY_CACHE_ROOT / f".current.{version}"
+            os.symlink(version, tmp_link)
+            os.replace(tmp_link, CURRENT_LINK)
+
+            _prune_versions(keep)
+            return version
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import tarfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from config import (
+    WORKSPACES_DIR,
+    WORKSPACE_QUOTA_BYTES,
+    WORKSPACE_MAX_AGE_DAYS,
+    WORKSPACE_COLD_AFTER_MINUTES,
+)
+from services import job_index, job_journal
+
+FINISHED_STATES = {"SUCCEEDED", "FAILED"}
+
+SOURCE_ARCHIVE = "source.tar.gz"
+EVICTED_MARKER = "evicted.json"
+
+# Files kept when a job is evicted, so its status stays readable
+KEPT_ON_EVICTION = {
+    "metadata.json",
+    job_journal.SNAPSHOT_FILE,
+    job_journal.EVENTS_FILE,
+    EVICTED_MARKER,
+}
+
+
+class WorkspaceGoneError(Exception):
+    """Job data was removed by the retention policy."""
+
+
+def is_evicted(job_dir: Path) -> bool:
+    return (job_dir / EVICTED_MARKER).exists()
+
+
+def ensure_available(job_id: str):
+    """
+    Raise WorkspaceGoneError when the reports / logs of a job were
+    evicted or the whole workspace was purged.
+    """
+    job_dir = WORKSPACES_DIR / job_id
+
+    if job_dir.is_dir():
+        if is_evicted(job_dir):
+            raise WorkspaceGoneError(f"Data of job {job_id} was evicted")
+        return
+
+    job = job_index.get_job(job_id)
+    if job and job["storage"] == "purged":
+        raise WorkspaceGoneError(f"Job {job_id} expired and was removed")
+
+
+def _disk_usage(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _parse(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+
+
+def compress_source(job_id: str) -> int:
+    """
+    Cold tier: pack source/ (including build output) into a single
+    archive next to the reports, which stay hot. Returns disk usage.
+    """
+    job_dir = WORKSPACES_DIR / job_id
+    source_dir = job_dir / "source"
+
+    if source_dir.is_dir():
+        partial = job_dir / f".{SOURCE_ARCHIVE}.partial"
+        with tarfile.open(partial, "w:gz") as tar:
+            tar.add(source_dir, arcname="source")
+        os.replace(partial, job_dir / SOURCE_ARCHIVE)
+        shutil.rmtree(source_dir, ignore_errors=True)
+
+    disk_bytes = _disk_usage(job_dir)
+    job_index.set_storage(job_id, "cold", disk_bytes)
+    return disk_bytes
+
+
+def evict(job_id: str) -> int:
+    """
+    Drop everything but metadata.json and the state journal. Status keeps
+    working, reports and logs answer 410. Returns freed bytes.
+    """
+    job_dir = WORKSPACES_DIR / job_id
+    freed = 0
+
+    if job_dir.is_dir():
+        before = _disk_usage(job_dir)
+        for entry in job_dir.iterdir():
+            if entry.name in KEPT_ON_EVICTION:
+                continue
+            if entry.is_dir() and not entry.is_symlink():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+        (job_dir / EVICTED_MARKER).write_text(
+            json.dumps({"evicted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}),
+            encoding="utf-8",
+        )
+        freed = before - _disk_usage(job_dir)
+
+    job_index.set_storage(job_id, "evicted", _disk_usage(job_dir) if job_dir.is_dir() else 0)
+    return freed
+
+
+def purge(job_id: str):
+    """Remove the workspace entirely, the index keeps a 'purged' row."""
+    shutil.rmtree(WORKSPACES_DIR / job_id, ignore_errors=True)
+    job_index.set_storage(job_id, "purged", 0)
+
+
+def sweep(now: datetime | None = None) -> dict:
+    """
+    Apply the retention policy:
+      1. purge finished workspaces not updated for WORKSPACE_MAX_AGE_DAYS
+      2. compress source/ of finished jobs (cold tier)
+      3. evict oldest finished jobs while over WORKSPACE_QUOTA_BYTES
+    """
+    now = now or datetime.now(timezone.utc)
+    expire_before = now - timedelta(days=WORKSPACE_MAX_AGE_DAYS)
+    cold_before = now - timedelta(minutes=WORKSPACE_COLD_AFTER_MINUTES)
+
+    stats = {"purged": 0, "compressed": 0, "evicted": 0, "disk_bytes": 0}
+    usage = {}
+
+    for job in job_index.jobs_on_disk():
+        job_id = job["job_id"]
+        updated_at = _parse(job["updated_at"])
+        finished = job["state"] in FINISHED_STATES
+
+        if finished and updated_at < expire_before:
+            purge(job_id)
+            stats["purged"] += 1
+            continue
+
+        if finished and job["storage"] == "hot" and updated_at < cold_before:
+            usage[job_id] = compress_source(job_id)
+            stats["compressed"] += 1
+        elif finished and job["disk_bytes"] is not None:
+            usage[job_id] = job["disk_bytes"]
+        else:
+            # running / queued jobs are measured but never touched
+            usage[job_id] = _disk_usage(WORKSPACES_DIR / job_id)
+            if finished:
+                job_index.set_storage(job_id, job["storage"], usage[job_id])
+
+    total = sum(usage.values())
+
+    # oldest first; running jobs and already evicted ones are skipped
+    for job in job_index.jobs_on_disk():
+        if total <= WORKSPACE_QUOTA_BYTES:
+            break
+        if job["state"] not in FINISHED_STATES or job["storage"] in {"evicted", "purged"}:
+            continue
+
+        total -= evict(job["job_id"])
+        stats["evicted"] += 1
+
+    stats["disk_bytes"] = total
+    return stats
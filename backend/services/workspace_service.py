@@ -3,6 +3,8 @@ from pathlib import Path
 from dataclasses import dataclass
 
 from config import WORKSPACES_DIR
+from services import job_index
+from utils.workspace_manifest import WorkspaceManifest
 
 
 @dataclass
@@ -11,20 +13,29 @@ class Workspace:
     job_dir: Path
     source_dir: Path
     input_type: str
+    manifest: WorkspaceManifest | None = None
+    # where the source came from, e.g. {"type": "github", "url": ..., "commit": ...}
+    source: dict | None = None
 
 
-def _generate_job_id() -> str:
+def _create_job_dir(input_type: str) -> tuple[str, Path]:
     WORKSPACES_DIR.mkdir(parents=True, exist_ok=True)
-    existing = sorted(p for p in WORKSPACES_DIR.glob("job-*") if p.is_dir())
-    return f"job-{len(existing) + 1:03d}"
+
+    while True:
+        job_id = job_index.allocate_job_id(input_type)
+        job_dir = WORKSPACES_DIR / job_id
+        try:
+            job_dir.mkdir()
+            return job_id, job_dir
+        except FileExistsError:
+            # directory the index does not know about: skip that id
+            job_index.remove_job(job_id)
 
 
 def create_workspace(*, input_type: str) -> Workspace:
-    job_id = _generate_job_id()
-    job_dir = WORKSPACES_DIR / job_id
+    job_id, job_dir = _create_job_dir(input_type)
     source_dir = job_dir / "source"
 
-    job_dir.mkdir()
     source_dir.mkdir()
     (job_dir / "pipelines").mkdir()
 
@@ -38,3 +49,5 @@ def create_workspace(*, input_type: str) -> Workspace:
 def cleanup_workspace(workspace: Workspace):
     if workspace.job_dir.exists():
         shutil.rmtree(workspace.job_dir, ignore_errors=True)
+
+    job_index.remove_job(workspace.job_id)
@@ -1,4 +1,4 @@
-import io
+import tempfile
 import zipfile
 import shutil
 from pathlib import Path
@@ -6,6 +6,7 @@ from fastapi import UploadFile
 
 from config import (
     MAX_UPLOAD_BYTES,
+    UPLOAD_CHUNK_BYTES,
     MAX_FILES,
     MAX_UNCOMPRESSED_BYTES,
     MAX_DEPTH,
@@ -30,19 +31,44 @@ def _normalize_single_root_directory(source_dir: Path):
         root.rmdir()
 
 
-def handle_zip_input(file: UploadFile):
-    raw = file.file.read()
-
-    if len(raw) > MAX_UPLOAD_BYTES:
+def _spool_upload(file: UploadFile):
+    """
+    Copy the upload to an anonymous temp file in fixed-size chunks,
+    aborting as soon as MAX_UPLOAD_BYTES is exceeded.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
         raise ValueError("Uploaded file exceeds maximum allowed size")
 
-    if not is_valid_zip_signature(raw[:8]):
-        raise ValueError("File is not a valid ZIP archive")
+    spool = tempfile.TemporaryFile()
+
+    try:
+        total = 0
+        while chunk := file.file.read(UPLOAD_CHUNK_BYTES):
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise ValueError("Uploaded file exceeds maximum allowed size")
+            spool.write(chunk)
+
+        spool.seek(0)
+        if not is_valid_zip_signature(spool.read(8)):
+            raise ValueError("File is not a valid ZIP archive")
+
+        spool.seek(0)
+        return spool
+
+    except Exception:
+        spool.close()
+        raise
 
-    workspace = create_workspace(input_type="zip")
+
+def handle_zip_input(file: UploadFile):
+    spool = _spool_upload(file)
+    workspace = None
 
     try:
-        with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+        workspace = create_workspace(input_type="zip")
+
+        with zipfile.ZipFile(spool) as zf:
             entries = zf.infolist()
 
             if len(entries) > MAX_FILES:
@@ -71,12 +97,17 @@ def handle_zip_input(file: UploadFile):
                 target_path.parent.mkdir(parents=True, exist_ok=True)
 
                 with zf.open(entry) as src, open(target_path, "wb") as dst:
-                    dst.write(src.read())
+                    shutil.copyfileobj(src, dst, UPLOAD_CHUNK_BYTES)
 
         _normalize_single_root_directory(workspace.source_dir)
         return workspace
 
     except Exception:
-        cleanup_workspace(workspace)
+        if workspace:
+            cleanup_workspace(workspace)
         raise
 
+    finally:
+        spool.close()
+
+
@@ -1,13 +1,32 @@
 import json
 import os
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 import shutil
 from typing import Optional
 
+from celery.signals import worker_ready
+
 from celery_app import celery_app
-from config import WORKSPACES_DIR, HOST_WORKSPACES_PATH
+from config import WORKSPACES_DIR, HOST_WORKSPACES_PATH, MAX_PARALLEL_STAGES
+from services import (
+    job_journal,
+    live_app,
+    maven_cache,
+    postgres_template,
+    runner_pool,
+    report_archive,
+    job_index,
+    stage_result_cache,
+    secret_scan_baseline,
+    semgrep_rules,
+    trivy_db,
+)
+from utils import docker_api, workspace_manifest
 
 
 PIPELINE_STAGES = [
@@ -27,6 +46,51 @@ BLOCKING_STAGES = {
     "SMOKE-TEST",
 }
 
+# Stages a stage has to wait for. Dependencies that are not selected for
+# the job are ignored; a dependency that failed a blocking stage skips all
+# of its dependents. TEST sits before PACKAGE because both drive maven on
+# the same target/ directory. SECRETS and SAST walk a snapshot of the
+# source (see _snapshot_scan_source), so they never wait for the build.
+STAGE_DEPENDENCIES = {
+    "SECRETS": [],
+    "BUILD": [],
+    "TEST": ["BUILD"],
+    "SAST": [],
+    "SCA": [],
+    "PACKAGE": ["BUILD", "TEST"],
+    "SMOKE-TEST": ["PACKAGE"],
+    "DAST": ["PACKAGE", "SMOKE-TEST"],
+}
+
+# Stages running maven against the shared local repository
+MAVEN_STAGES = {"BUILD", "TEST", "PACKAGE"}
+
+# Copy of source/ taken before any stage runs, scanned by the stages
+# walking the whole tree while the maven stages write into target/
+SCAN_SOURCE_DIR = "scan-source"
+
+# Pipeline scripts report "FAILED", older ones "FAILURE"
+FAILED_STATUSES = {"FAILED", "FAILURE"}
+
+# the job state is updated by several stage threads of the same job
+_STATE_LOCK = threading.Lock()
+
+# job_id -> state journal of the running job
+_JOB_JOURNALS: dict[str, job_journal.JobJournal] = {}
+
+# job_id -> leased runner container
+_JOB_RUNNERS: dict[str, runner_pool.RunnerLease] = {}
+
+# job_id -> application instance shared by SMOKE-TEST and DAST, created
+# by the first of them to run
+_JOB_LIVE_APPS: dict[str, live_app.LiveApp] = {}
+_LIVE_APPS_LOCK = threading.Lock()
+
+JAVA_MAVEN_RUNNER_IMAGE = "abderrahmane03/pipelinex:java17-mvn3.9.12-latest"
+
+# Images kept warm in the runner pool
+RUNNER_IMAGES = [JAVA_MAVEN_RUNNER_IMAGE]
+
 SECRETS_SCRIPT_BY_MODE = {
     "dir": "secrets-dir.sh",
     "git": "secrets-git.sh",
@@ -48,11 +112,28 @@ def execute_job(self, job_id: str):
         stages = _resolve_pipeline_stages(metadata)
         _init_state(job_dir, stages)
 
-        _start_runner_container(job_id, metadata)
+        runner = _start_runner_container(job_id, metadata)
+        _set_state_fields(
+            job_dir,
+            runner={
+                "warm": runner.warm,
+                "lease_ms": runner.lease_ms,
+            },
+        )
 
-        for stage, status in stages.items():
-            if status == "PENDING":
-                _run_stage(job_dir, job_id, metadata, stage)
+        # before any stage runs: BUILD writes into source/ meanwhile
+        cache_keys = _result_cache_keys(job_dir, metadata, stages, runner.image)
+        _snapshot_scan_source(job_dir, metadata, stages)
+
+        with maven_cache.cache_lease():
+            failed_blocking = _run_stage_graph(
+                job_dir, job_id, metadata, stages, cache_keys
+            )
+
+        if failed_blocking:
+            raise RuntimeError(
+                f"Blocking stage {', '.join(failed_blocking)} failed"
+            )
 
         _finalize_job(job_dir, success=True)
 
@@ -61,49 +142,79 @@ def execute_job(self, job_id: str):
         raise
 
     finally:
+        _stop_live_app(job_id)
         _stop_runner_container(job_id)
+        shutil.rmtree(job_dir / SCAN_SOURCE_DIR, ignore_errors=True)
+        _JOB_JOURNALS.pop(job_id, None)
+
+
+@worker_ready.connect
+def _warm_runner_pool(**_):
+    """Pre-start runner containers so the first jobs get a warm lease."""
+    if not trivy_db.current_version():
+        celery_app.send_task("refresh_trivy_db")
+    if not semgrep_rules.current_version():
+        celery_app.send_task("refresh_semgrep_rules")
+
+    for image in RUNNER_IMAGES:
+        try:
+            runner_pool.refill(image)
+        except Exception as e:
+            print(f"Warning: could not warm runner pool for {image}: {e}")
 
 
 # ---------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------
 
+def _chmod(path, mode: int):
+    try:
+        os.chmod(path, mode)
+    except Exception as e:
+        print(f"Warning: Could not chmod {path}: {e}")
+
+
 def _prepare_workspace_permissions(job_dir: Path):
     """
     Set permissions recursively so runner container (UID 10001) can access.
     Uses os.chmod() which works with bind mounts.
+
+    source/ is taken from the manifest written at admission (no second
+    walk, entries already carrying the right mode are skipped); the rest
+    of the job directory is small and walked directly.
+    Directories get 777, files 666 and pipeline scripts 755.
     """
+    source_dir = job_dir / "source"
+    manifest_path = job_dir / workspace_manifest.MANIFEST_FILE
+    covered = False
+
+    if source_dir.is_dir() and manifest_path.exists():
+        manifest = workspace_manifest.WorkspaceManifest.load(manifest_path)
+        covered = True
+
+        _chmod(source_dir, 0o777)
+        for entry in manifest.dirs:
+            if entry.mode != 0o777:
+                _chmod(source_dir / entry.path, 0o777)
+        for entry in manifest.files:
+            # never chmod through a symlink, it may point outside the job
+            if not entry.is_symlink and entry.mode != 0o666:
+                _chmod(source_dir / entry.path, 0o666)
+
+    pipelines_dir = str(job_dir / "pipelines")
+
     for root, dirs, files in os.walk(job_dir):
-        # Set directory permissions to 777 (rwxrwxrwx)
-        try:
-            os.chmod(root, 0o777)
-        except Exception as e:
-            print(f"Warning: Could not chmod {root}: {e}")
+        if covered and root == str(job_dir) and "source" in dirs:
+            dirs.remove("source")
 
-        # Set all subdirectories to 777
-        for d in dirs:
-            dir_path = os.path.join(root, d)
-            try:
-                os.chmod(dir_path, 0o777)
-            except Exception as e:
-                print(f"Warning: Could not chmod {dir_path}: {e}")
+        _chmod(root, 0o777)
+        is_pipeline = root.startswith(pipelines_dir)
 
-        # Set all files to 666 (rw-rw-rw-)
         for f in files:
-            file_path = os.path.join(root, f)
-            try:
-                os.chmod(file_path, 0o666)
-            except Exception as e:
-                print(f"Warning: Could not chmod {file_path}: {e}")
-
-    # Make shell scripts executable (755)
-    pipelines_dir = job_dir / "pipelines"
-    if pipelines_dir.exists():
-        for script in pipelines_dir.rglob("*.sh"):
-            try:
-                script.chmod(0o755)
-            except Exception as e:
-                print(f"Warning: Could not chmod {script}: {e}")
+            path = os.path.join(root, f)
+            if os.path.islink(path):
+                continue
+            _chmod(path, 0o755 if is_pipeline and f.endswith(".sh") else 0o666)
 
 
 def _resolve_pipeline_stages(metadata: dict) -> dict:
@@ -130,35 +241,153 @@ def _resolve_pipeline_stages(metadata: dict) -> dict:
     return stages
 
 
+def _resolve_max_parallel_stages(metadata: dict) -> int:
+    """Per-job stage concurrency, falling back to the worker default."""
+    limit = metadata.get("pipeline", {}).get("max_parallel_stages")
+    return max(1, int(limit or MAX_PARALLEL_STAGES))
+
+
+def _run_stage_graph(
+    job_dir: Path,
+    job_id: str,
+    metadata: dict,
+    stages: dict,
+    cache_keys: dict[str, str],
+) -> list[str]:
+    """
+    Run the selected stages following STAGE_DEPENDENCIES.
+
+    Independent stages run in parallel, up to the job concurrency limit.
+    Returns the blocking stages that failed (their dependents are SKIPPED).
+    """
+    selected = {stage for stage, status in stages.items() if status == "PENDING"}
+    pending = [stage for stage in stages if stage in selected]
+
+    finished = set()
+    blocked = set()
+    failed_blocking = []
+
+    with ThreadPoolExecutor(
+        max_workers=_resolve_max_parallel_stages(metadata),
+        thread_name_prefix=f"{job_id}-stage",
+    ) as pool:
+        running = {}
+
+        while pending or running:
+            # pending keeps pipeline order, so dependencies are seen first
+            for stage in list(pending):
+                deps = [d for d in STAGE_DEPENDENCIES.get(stage, []) if d in selected]
+                failed_deps = [d for d in deps if d in blocked]
+
+                if failed_deps:
+                    pending.remove(stage)
+                    finished.add(stage)
+                    blocked.add(stage)
+                    _update_stage(
+                        job_dir,
+                        stage,
+                        status="SKIPPED",
+                        message=f"Skipped because {failed_deps[0]} did not succeed",
+                    )
+                    continue
+
+                if all(d in finished for d in deps):
+                    pending.remove(stage)
+                    future = pool.submit(
+                        _run_stage, job_dir, job_id, metadata, stage,
+                        cache_keys.get(stage),
+                    )
+                    running[future] = stage
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage = running.pop(future)
+                finished.add(stage)
+
+                try:
+                    stage_status = future.result()
+                except Exception as exc:
+                    stage_status = "FAILED"
+                    _update_stage(job_dir, stage, status="FAILED", message=str(exc))
+
+                if stage_status in FAILED_STATUSES and stage in BLOCKING_STAGES:
+                    blocked.add(stage)
+                    failed_blocking.append(stage)
+
+    return failed_blocking
+
+
 def _init_state(job_dir: Path, stages: dict):
-    """Initialize the state.json file with starting state."""
+    """Start the job's state journal (events.jsonl + state.json)."""
     state = {
         "state": "RUNNING",
         "current_stage": None,
+        "running_stages": [],
         "updated_at": _now(),
         "stages": {
             stage: {
                 "status": status,
-                "message": None
+                "message": None,
+                "started_at": None,
+                "finished_at": None,
+                "duration_ms": None,
             }
             for stage, status in stages.items()
         },
     }
-    _write_state(job_dir, state)
+    with _STATE_LOCK:
+        _JOB_JOURNALS[job_dir.name] = job_journal.JobJournal(job_dir, state)
+        _sync_job_index(job_dir, state)
 
 
-def _write_state(job_dir: Path, payload: dict):
-    """Write state to state.json file."""
-    state_file = job_dir / "state.json"
-    state_file.write_text(
-        json.dumps(payload, indent=2),
-        encoding="utf-8",
-    )
-    # Make state file readable
+def _record_event(job_dir: Path, event: dict) -> dict:
+    """Append a state event to the job journal. Caller holds _STATE_LOCK."""
+    state = _JOB_JOURNALS[job_dir.name].record({"ts": _now(), **event})
+    _sync_job_index(job_dir, state)
+    return state
+
+
+def _set_state_fields(job_dir: Path, **fields):
+    """Update top-level fields of the job state."""
+    with _STATE_LOCK:
+        _record_event(job_dir, {"type": "job", "fields": fields})
+
+
+def _update_stage(job_dir: Path, stage: str, **fields):
+    """
+    Update one stage entry of the job state.
+
+    running_stages / current_stage follow from the status (see
+    job_journal.apply_event); per-stage timings are recorded on
+    RUNNING -> finished transitions.
+    """
+    with _STATE_LOCK:
+        entry = _JOB_JOURNALS[job_dir.name].state["stages"][stage]
+        status = fields.get("status", entry.get("status"))
+
+        if status == "RUNNING":
+            fields.update(started_at=_now(), finished_at=None, duration_ms=None)
+        elif entry.get("status") == "RUNNING":
+            finished_at = datetime.now(timezone.utc)
+            started_at = datetime.fromisoformat(entry["started_at"])
+            fields.update(
+                finished_at=finished_at.isoformat(),
+                duration_ms=int((finished_at - started_at).total_seconds() * 1000),
+            )
+
+        _record_event(job_dir, {"type": "stage", "stage": stage, "fields": fields})
+
+
+def _sync_job_index(job_dir: Path, state: dict):
+    """Keep the job listing index in sync (never fails the job)."""
     try:
-        state_file.chmod(0o666)
-    except:
-        pass
+        job_index.record_execution(job_dir.name, state)
+    except Exception as e:
+        print(f"Warning: Could not update job index: {e}")
 
 
 def _now() -> str:
@@ -166,44 +395,72 @@ def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _start_runner_container(job_id: str, metadata: dict):
+def _start_runner_container(job_id: str, metadata: dict) -> runner_pool.RunnerLease:
     """
-    Start a Docker container that will execute pipeline stages.
-    The container mounts the host workspaces directory.
+    Lease a runner container that will execute pipeline stages.
+    Runners are pooled per image and mount the host workspaces directory.
     """
-    image = _select_runner_image(metadata)
-
-    subprocess.run(
-        [
-            "docker", "run", "-d",
-            "--name", f"runner-{job_id}",
-            "-u", "10001:10001",  # Run as non-root user
-
-            # Environment variables for pipeline scripts
-            "-e", f"APP_DIR=/home/runner/workspaces/{job_id}/source",
-            "-e", f"PIPELINES_DIR=/home/runner/workspaces/{job_id}/pipelines",
-            "-e", f"REPORTS_DIR=/home/runner/workspaces/{job_id}/reports",
-
-            # Mount host workspaces directory
-            "-v", f"{HOST_WORKSPACES_PATH}:/home/runner/workspaces",
-
-            "-w", "/home/runner",
-            image,
-            "tail", "-f", "/dev/null",  # Keep container running
-        ],
-        check=True,
-    )
-    
-    # Fix Git safe.directory issue (Git 2.35.2+ security feature)
-    # This allows Git to work with repos owned by different users
-    subprocess.run(
-        [
-            "docker", "exec", f"runner-{job_id}",
-            "git", "config", "--global", "--add", "safe.directory", 
-            f"/home/runner/workspaces/{job_id}/source"
-        ],
-        check=False,  # Don't fail if git config fails
-    )
+    runner = runner_pool.lease(_select_runner_image(metadata))
+    _JOB_RUNNERS[job_id] = runner
+    return runner
+
+
+def _runner_container(job_id: str) -> str:
+    return _JOB_RUNNERS[job_id].container
+
+
+def _runner_exec_env(job_id: str, source: str = "source") -> list[str]:
+    """Exec environment pointing pipeline scripts at the job workspace."""
+    return [
+        f"APP_DIR=/home/runner/workspaces/{job_id}/{source}",
+        f"PIPELINES_DIR=/home/runner/workspaces/{job_id}/pipelines",
+        f"REPORTS_DIR=/home/runner/workspaces/{job_id}/reports",
+    ]
+
+
+def _scans_source_tree(metadata: dict, stage: str) -> bool:
+    """SAST and SECRETS walk every file; git-mode secret scans read .git only."""
+    if stage == "SECRETS":
+        return metadata.get("pipeline", {}).get("secret_scan_mode") != "git"
+    return stage == "SAST"
+
+
+def _snapshot_scan_source(job_dir: Path, metadata: dict, stages: dict):
+    """
+    Copy source/ (without .git) for the tree-walking scanners when maven
+    stages run next to them: BUILD removes and recreates target/, which
+    made scan results depend on timing. The copy is exactly the tree the
+    result cache keys were computed from.
+    """
+    selected = {stage for stage, status in stages.items() if status == "PENDING"}
+    if not selected & MAVEN_STAGES:
+        return
+    if not any(_scans_source_tree(metadata, stage) for stage in selected):
+        return
+
+    source_dir = job_dir / "source"
+    snapshot = job_dir / SCAN_SOURCE_DIR
+    shutil.rmtree(snapshot, ignore_errors=True)
+    snapshot.mkdir()
+    _chmod(snapshot, 0o777)
+    entries = [str(p) for p in source_dir.iterdir() if p.name != ".git"]
+    try:
+        if entries:
+            # -a keeps the modes set by _prepare_workspace_permissions
+            subprocess.run(
+                ["cp", "-a", "--reflink=auto", *entries, str(snapshot)],
+                check=True,
+                timeout=300,
+            )
+    except Exception as e:
+        print(f"Warning: could not snapshot source for scanners, scanning source/: {e}")
+        shutil.rmtree(snapshot, ignore_errors=True)
+
+
+def _stage_source_dir(job_dir: Path, metadata: dict, stage: str) -> str:
+    if _scans_source_tree(metadata, stage) and (job_dir / SCAN_SOURCE_DIR).is_dir():
+        return SCAN_SOURCE_DIR
+    return "source"
 
 
 def _select_runner_image(metadata: dict) -> str:
@@ -211,26 +468,173 @@ def _select_runner_image(metadata: dict) -> str:
     stack = metadata.get("stack", {})
 
     if stack.get("language") == "java" and stack.get("build_tool") == "maven":
-        return "abderrahmane03/pipelinex:java17-mvn3.9.12-latest"
+        return JAVA_MAVEN_RUNNER_IMAGE
 
     raise RuntimeError("Unsupported stack for runner selection")
 
 
+def _result_cache_keys(
+    job_dir: Path,
+    metadata: dict,
+    stages: dict,
+    image: str,
+) -> dict[str, str]:
+    """
+    Result cache key of every selected cacheable stage: source content,
+    installed stage script and runner image (plus HEAD for git scans).
+    """
+    pipeline = metadata.get("pipeline", {})
+    if not pipeline.get("use_result_cache", True):
+        return {}
+
+    cacheable = [
+        stage for stage, status in stages.items()
+        if status == "PENDING" and stage_result_cache.is_cacheable(stage, pipeline)
+    ]
+    if not cacheable:
+        return {}
+
+    try:
+        source = stage_result_cache.source_digest(job_dir)
+        image_id = stage_result_cache.image_digest(image)
+    except Exception as e:
+        print(f"Warning: result cache disabled for {job_dir.name}: {e}")
+        return {}
+
+    keys = {}
+    for stage in cacheable:
+        script = _resolve_stage_script(metadata, stage)
+        parts = {
+            "source": source,
+            "script": stage_result_cache.file_digest(
+                job_dir / "pipelines" / script.removeprefix("$PIPELINES_DIR/")
+            ),
+            "image": image_id,
+        }
+
+        if stage == "SECRETS" and pipeline.get("secret_scan_mode") == "git":
+            if pipeline.get("secret_scan_full"):
+                # an explicit full rescan must not be answered from cache
+                continue
+            head = stage_result_cache.git_head(job_dir / "source")
+            if not head:
+                continue
+            parts["git_head"] = head
+
+        if stage == "SCA":
+            # a DB refresh invalidates earlier results
+            parts["trivy_db"] = trivy_db.current_version() or "online"
+
+        if stage == "SAST":
+            parts["rules"] = semgrep_rules.current_version() or "registry"
+
+        keys[stage] = stage_result_cache.stage_key(stage, **parts)
+
+    return keys
+
+
+def _restore_cached_stage(
+    job_dir: Path,
+    stage: str,
+    report_dir: Path,
+    cache_key: str,
+) -> str | None:
+    """Reuse a cached result; returns the stage status, None on a miss."""
+    try:
+        hit = stage_result_cache.restore(cache_key, report_dir)
+        if not hit:
+            return None
+        result = json.loads((report_dir / "result.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not restore cached {stage} result: {e}")
+        return None
+
+    stage_status = result.get("status", "FAILED")
+    _update_stage(
+        job_dir,
+        stage,
+        status=stage_status,
+        message=result.get("message"),
+        cache_hit=True,
+        cached_from=hit.get("job_id"),
+    )
+    return stage_status
+
+
+def _maven_exec_env(pipeline: dict, stage: str) -> list[str]:
+    """
+    Maven options of the job. In incremental mode (default) only BUILD
+    cleans: TEST and PACKAGE reuse its target/ instead of recompiling.
+    """
+    incremental = pipeline.get("incremental_build", True)
+    args = []
+
+    if pipeline.get("maven_threads"):
+        args += ["-T", pipeline["maven_threads"]]
+
+    if stage == "TEST":
+        if pipeline.get("surefire_fork_count"):
+            args.append(f"-DforkCount={pipeline['surefire_fork_count']}")
+        if pipeline.get("surefire_reuse_forks") is not None:
+            args.append(f"-DreuseForks={str(pipeline['surefire_reuse_forks']).lower()}")
+
+    return [
+        f"PIPELINE_INCREMENTAL={str(incremental).lower()}",
+        f"MAVEN_EXTRA_ARGS={' '.join(args)}",
+    ]
+
+
+def _plan_secret_scan(
+    job_dir: Path,
+    job_id: str,
+    metadata: dict,
+) -> secret_scan_baseline.ScanPlan | None:
+    """Incremental git history scan plan, None when the repository is unknown."""
+    repository = (metadata.get("source") or {}).get("repository")
+    if not repository:
+        return None
+
+    try:
+        return secret_scan_baseline.plan_scan(
+            job_dir / "source",
+            repository,
+            stage_result_cache.image_digest(_JOB_RUNNERS[job_id].image),
+            full=metadata.get("pipeline", {}).get("secret_scan_full", False),
+        )
+    except Exception as e:
+        print(f"Warning: incremental secret scan disabled for {job_id}: {e}")
+        return None
+
+
+def _record_secret_scan(
+    report_dir: Path,
+    result: dict,
+    plan: secret_scan_baseline.ScanPlan,
+) -> dict:
+    """Merge the scanned range into the repository baseline, update result.json."""
+    summary = secret_scan_baseline.merge_and_record(report_dir, plan)
+
+    result["scan"] = summary
+    result["message"] = (
+        f"leaks found ({summary['new_findings']} new, {summary['total_findings']} total), "
+        f"see {secret_scan_baseline.FINDINGS_FILE} for details"
+        if summary["total_findings"]
+        else "no leaks found"
+    )
+    (report_dir / "result.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return result
+
+
 def _run_stage(
     job_dir: Path,
     job_id: str,
     metadata: dict,
     stage: str,
+    cache_key: str | None = None,
 ):
-    """Execute a single pipeline stage."""
-    state = _read_state(job_dir)
-
+    """Execute a single pipeline stage and return its result status."""
     # Update state → RUNNING
-    state["current_stage"] = stage
-    state["stages"][stage]["status"] = "RUNNING"
-    state["stages"][stage]["message"] = None
-    state["updated_at"] = _now()
-    _write_state(job_dir, state)
+    _update_stage(job_dir, stage, status="RUNNING", message=None)
 
     # Create stage-specific report directory
     stage_report_dir = job_dir / "reports" / stage.lower()
@@ -241,20 +645,23 @@ def _run_stage(
         stage_report_dir.chmod(0o777)
     except:
         pass
+
+    # a retried job (acks_late redelivery) must not pick up the previous
+    # attempt's result while the stage is still running
+    (stage_report_dir / "result.json").unlink(missing_ok=True)
+
+    if cache_key:
+        cached_status = _restore_cached_stage(job_dir, stage, stage_report_dir, cache_key)
+        if cached_status is not None:
+            return cached_status
     
-    topology = resolve_topology(stage, metadata)
-
-    if needs_compose(topology):
-        _run_dynamic_compose(
-            job_dir=job_dir,
-            job_id=job_id,
-            metadata=metadata,
-            stage=stage,
-            topology=topology,
-        )
+    app = _live_app_for(job_dir, job_id, metadata, stage)
+
+    if app:
+        _run_live_app_stage(app, stage, stage_report_dir)
 
-        # DAST still produces result.json on filesystem
-        result_path = job_dir / "reports" / stage.lower() / "result.json"
+        # the check containers write result.json on the filesystem
+        result_path = stage_report_dir / "result.json"
         if not result_path.exists():
             raise RuntimeError(f"{stage} did not produce reports/{stage.lower()}/result.json")
 
@@ -276,6 +683,12 @@ def _run_stage(
                 f'export LOG_EXT=".{custom.get("log_ext", "json")}"',
             ]
 
+        secret_plan = None
+        if stage == "SECRETS" and pipeline.get("secret_scan_mode") == "git":
+            secret_plan = _plan_secret_scan(job_dir, job_id, metadata)
+            if secret_plan:
+                env_exports = [f'export GITLEAKS_LOG_OPTS="{secret_plan.log_opts}"']
+
         if stage == "SAST" and pipeline.get("sast_mode") == "custom":
             custom = pipeline.get("sast_custom", {})
             env_exports = [
@@ -287,114 +700,195 @@ def _run_stage(
 
         env_prefix = " && ".join(env_exports)
 
+        stage_env = []
+        trivy_version = None
+        if stage == "SCA":
+            trivy_version = trivy_db.current_version()
+            stage_env = trivy_db.runner_exec_env(trivy_version)
+
+        if stage == "SAST" and pipeline.get("sast_mode") != "custom":
+            stage_env = semgrep_rules.runner_exec_env(semgrep_rules.current_version())
+
+        if stage in MAVEN_STAGES:
+            stage_env = _maven_exec_env(pipeline, stage)
+
         cmd = (
             f'{env_prefix} && cd "$APP_DIR" && bash {stage_script}'
             if env_exports
             else f'cd "$APP_DIR" && bash {stage_script}'
         )
 
-        subprocess.run(
-            [
-                "docker", "exec",
-                f"runner-{job_id}",
-                "bash", "-lc",
-                cmd,
-            ],
-            check=False,
+        # The workspace is bind mounted: the worker reads the result
+        # itself once the script exited
+        output_dir = job_dir / "reports" / _stage_output_dir(metadata, stage)
+        (output_dir / "result.json").unlink(missing_ok=True)
+        result, exit_code = _exec_stage_script(
+            _runner_container(job_id),
+            ["bash", "-lc", cmd],
+            [*_runner_exec_env(job_id, _stage_source_dir(job_dir, metadata, stage)), *stage_env],
+            output_dir / "result.json",
         )
+        if result is None:
+            raise RuntimeError(
+                f"{stage} did not produce result.json in workspace reports directory "
+                f"(script exit code {exit_code})"
+            )
 
+        # SECRETS (secrets-dir / secrets-git) and custom scripts report elsewhere
+        if output_dir != stage_report_dir:
+            _move_reports(output_dir, stage_report_dir)
 
-        # Special handling for SECRETS stage (normalize output location)
-        if stage == "SECRETS":
-            subprocess.run(
-                [
-                    "docker", "exec",
-                    f"runner-{job_id}",
-                    "bash", "-lc",
-                    (
-                        "mkdir -p $REPORTS_DIR/secrets && "
-                        "if [ -f $REPORTS_DIR/secrets-dir/result.json ]; then "
-                        "  mv $REPORTS_DIR/secrets-dir/* $REPORTS_DIR/secrets/ && "
-                        "  rmdir $REPORTS_DIR/secrets-dir; "
-                        "elif [ -f $REPORTS_DIR/secrets-git/result.json ]; then "
-                        "  mv $REPORTS_DIR/secrets-git/* $REPORTS_DIR/secrets/ && "
-                        "  rmdir $REPORTS_DIR/secrets-git; "
-                        "fi"
-                    ),
-                ],
-                check=True,
-            )
+        if secret_plan and result.get("status") == "SUCCESS":
+            result = _record_secret_scan(stage_report_dir, result, secret_plan)
 
-        # Read the stage result
-        try:
-            raw = subprocess.check_output(
-                [
-                    "docker", "exec", f"runner-{job_id}",
-                    "bash", "-lc",
-                    f"cat $REPORTS_DIR/{stage.lower()}/result.json",
-                ],
-                text=True,
-            )
-        except subprocess.CalledProcessError:
-            raise RuntimeError(
-                f"{stage} did not produce result.json in workspace reports directory"
+        if stage == "SCA":
+            # empty when the runner could not see the shared DB
+            shared = bool(result.get("trivy_cache_dir"))
+            result["vulnerability_db"] = (shared and trivy_db.db_info(trivy_version)) or {
+                "cache_version": None,
+                "message": "downloaded by trivy during the scan",
+            }
+            (stage_report_dir / "result.json").write_text(
+                json.dumps(result, indent=2), encoding="utf-8"
             )
 
-        result = json.loads(raw)
-
-    stage_status = result.get("status", "FAILURE")
+    stage_status = result.get("status", "FAILED")
     stage_message = result.get("message")
 
-    state["stages"][stage]["status"] = stage_status
-    state["stages"][stage]["message"] = stage_message
-    state["updated_at"] = _now()
-    _write_state(job_dir, state)
+    extra = {}
+    if result.get("startup_ms") is not None:
+        extra["startup_ms"] = result["startup_ms"]
+
+    if stage in MAVEN_STAGES:
+        maven_stats = maven_cache.stage_stats(stage_report_dir / f"{stage.lower()}.log")
+        if maven_stats is not None:
+            extra["maven_cache"] = maven_stats
 
-    # Stop pipeline  on blocking stage
-    if stage_status == "FAILURE" and stage in BLOCKING_STAGES:
-        state["state"] = "FAILED"
-        state["error"] = stage_message or f"{stage} failed"
-        _write_state(job_dir, state)
-        raise RuntimeError(f"Blocking stage {stage} failed")
+    if cache_key:
+        extra["cache_hit"] = False
+        # tool errors are not worth replaying
+        if stage_status == "SUCCESS":
+            stage_result_cache.store(cache_key, stage_report_dir, job_id)
 
+    _update_stage(
+        job_dir, stage, status=stage_status, message=stage_message, **extra
+    )
 
-def _read_state(job_dir: Path) -> dict:
-    """Read current state from state.json."""
-    return json.loads((job_dir / "state.json").read_text())
+    return stage_status
+
+
+def _stage_output_dir(metadata: dict, stage: str) -> str:
+    """Reports directory the stage script writes to (under reports/)."""
+    pipeline = metadata.get("pipeline", {})
+
+    # custom.sh writes to $REPORTS_DIR/$STAGE
+    if stage == "SECRETS" and pipeline.get("secret_scan_mode") == "custom":
+        return stage
+    if stage == "SAST" and pipeline.get("sast_mode") == "custom":
+        return stage
+
+    if stage == "SECRETS":
+        script = SECRETS_SCRIPT_BY_MODE[pipeline.get("secret_scan_mode", "dir")]
+        return script.removesuffix(".sh")
+
+    return stage.lower()
+
+
+def _read_result(path: Path) -> dict | None:
+    """result.json once complete; scripts write it with a plain redirect."""
+    try:
+        result = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return result if isinstance(result, dict) else None
+
+
+def _exec_stage_script(
+    container: str,
+    cmd: list[str],
+    env: list[str],
+    result_path: Path,
+) -> tuple[dict | None, int | None]:
+    """
+    Run a stage script in the runner and read its result.json once the
+    script exited, so every report it writes is in place before the
+    reports are moved. Long-running apps live in the LiveApp, not behind
+    the exec stream. A failed exec still yields the result when it was
+    written.
+    Returns (result or None, exit code or None when the exec failed).
+    """
+    exit_code = None
+    try:
+        exit_code = docker_api.exec_run(container, cmd, env=env)
+    except Exception as e:
+        print(f"Warning: stage exec in {container} failed: {e}")
+
+    return _read_result(result_path), exit_code
+
+
+def _move_reports(src: Path, dest: Path):
+    """Move a script's reports into the stage report directory."""
+    dest.mkdir(parents=True, exist_ok=True)
+    for entry in src.iterdir():
+        os.replace(entry, dest / entry.name)
+    try:
+        src.rmdir()
+    except OSError:
+        pass
 
-def _run_dynamic_compose(
-    *,
+
+def _create_live_app(
     job_dir: Path,
     job_id: str,
     metadata: dict,
-    stage: str,
-    topology: dict,
-):
+    stages: dict,
+) -> live_app.LiveApp | None:
     """
-    Runs a dynamically assembled docker-compose based on topology.
-    Currently supports:
+    Compose project running the packaged app (+ db) for SMOKE-TEST and
+    DAST, None when no selected stage needs one.
+
+    Fragments are assembled from the topology:
       - app
       - app + db
       - app + zap
       - app + db + zap
+    plus the smoke check container when SMOKE-TEST runs against it. The
+    db starts from a per-job copy of a pre-initialized data directory,
+    made when the app is brought up (LiveApp prepare).
     """
+    live_stages = _live_app_stages(metadata, stages)
+    if not live_stages:
+        return None
 
     compose_root = _repo_root() / "runners" / "compose"
     if not compose_root.exists():
         raise RuntimeError("compose templates directory not found")
 
-    compose_files = select_compose_files(stage, topology)
+    topology = resolve_topology(live_stages, metadata)
+
+    db = metadata.get("database")
+    if topology["db"] and not db:
+        raise RuntimeError(
+            "Topology requires database but no database configuration found in metadata"
+        )
+
+    def prepare() -> list[Path]:
+        if topology["db"]:
+            # may build the template first (initdb, once per db config)
+            topology["db_template"] = postgres_template.clone_into(db, job_dir / "db-data")
 
-    # Copy compose fragments into job workspace
-    copied_files = []
-    for name in compose_files:
-        src = compose_root / name
-        if not src.exists():
-            raise RuntimeError(f"Compose fragment not found: {src}")
+        # Copy compose fragments into job workspace
+        copied_files = []
+        for name in select_compose_files(topology):
+            src = compose_root / name
+            if not src.exists():
+                raise RuntimeError(f"Compose fragment not found: {src}")
 
-        dst = job_dir / name
-        shutil.copyfile(src, dst)
-        copied_files.append(dst)
+            dst = job_dir / name
+            shutil.copyfile(src, dst)
+            copied_files.append(dst)
+
+        return copied_files
 
     port = "8080"
     network = f"pipelinex-net-{job_id}"
@@ -405,12 +899,6 @@ def _run_dynamic_compose(
     # Inject database configuration (if required)
     # ------------------------------------------------------------------
     if topology.get("db"):
-        db = metadata.get("database")
-        if not db:
-            raise RuntimeError(
-                "Topology requires database but no database configuration found in metadata"
-            )
-
         env.update({
             "DB_IMAGE": db.get("image", "postgres:15"),
             "DB_NAME": db.get("name", "app"),
@@ -426,52 +914,85 @@ def _run_dynamic_compose(
         "DOCKER_NETWORK": network,
         "HOST_WORKSPACES_PATH": HOST_WORKSPACES_PATH,
         "APP_IMAGE": _select_runner_image(metadata),
+        "PIPELINE_DIR": _resolve_pipeline_dir(metadata),
     })
 
-    # Inject SCRIPT for app-runner based stages
-    if stage != "DAST":
-        env["SCRIPT"] = f"/home/runner/pipelines/{_resolve_pipeline_dir(metadata)}/{stage.lower()}.sh"
+    return live_app.LiveApp(
+        job_dir=job_dir,
+        compose_cmd=_docker_compose_base_cmd(),
+        prepare=prepare,
+        env=env,
+        stages=live_stages,
+    )
 
-    compose_cmd = _docker_compose_base_cmd()
 
-    up_cmd = compose_cmd + sum(
-        [["-f", str(f)] for f in copied_files],
-        []
-    ) + [
-        "up",
-        "--abort-on-container-exit",
-        "--exit-code-from", "zap" if topology["zap"] else "app",
-    ]
+def _live_app_for(
+    job_dir: Path,
+    job_id: str,
+    metadata: dict,
+    stage: str,
+) -> live_app.LiveApp | None:
+    """
+    The job's shared app instance when `stage` runs against it, created
+    on first use: jobs that never get to SMOKE-TEST / DAST (failed
+    build, ...) don't pay for it.
+    """
+    # selection as resolved when the job started
+    stages = _resolve_pipeline_stages(metadata)
+    if stage not in _live_app_stages(metadata, stages):
+        return None
+
+    with _LIVE_APPS_LOCK:
+        app = _JOB_LIVE_APPS.get(job_id)
+        if app is None:
+            app = _JOB_LIVE_APPS[job_id] = _create_live_app(
+                job_dir, job_id, metadata, stages
+            )
+
+    return app
 
-    down_cmd = compose_cmd + sum(
-        [["-f", str(f)] for f in copied_files],
-        []
-    ) + [
-        "down",
-        "-v",
-        "--remove-orphans",
-    ]
 
+def _run_live_app_stage(app: live_app.LiveApp, stage: str, report_dir: Path):
+    """Run the SMOKE-TEST / DAST check container against the shared app."""
     try:
-        subprocess.run(up_cmd, cwd=str(job_dir), env=env, check=False)
+        if stage == "SMOKE-TEST":
+            app.run("smoke")
+            app.save_logs(report_dir / "smoke-test.log")
+        else:
+            app.run("zap")
+            app.save_logs(report_dir / "app.log")
     finally:
-        subprocess.run(down_cmd, cwd=str(job_dir), env=env, check=False)
-
-    # Ensure report permissions
-    report_dir = job_dir / "reports" / stage.lower()
-    if report_dir.exists():
+        # Ensure report permissions
         try:
             report_dir.chmod(0o777)
         except:
             pass
+        app.release(stage)
+
+
+def _stop_live_app(job_id: str):
+    """Tear the shared app down when the job ends before releasing it."""
+    app = _JOB_LIVE_APPS.pop(job_id, None)
+    if app is None:
+        return
+
+    try:
+        app.stop()
+    except Exception as e:
+        print(f"Warning: could not stop application containers: {e}")
+
+    # the job's copy of the postgres template
+    shutil.rmtree(app.job_dir / "db-data", ignore_errors=True)
 
 def _repo_root() -> Path:
     # backend/tasks/job_execution.py -> parents[2] == repo root
     return Path(__file__).resolve().parents[2]
 
+@lru_cache(maxsize=1)
 def _docker_compose_base_cmd() -> list[str]:
     """
     Prefer 'docker compose'. Fallback to 'docker-compose' if needed.
+    Probed once per worker process.
     """
     try:
         subprocess.run(["docker", "compose", "version"], check=True,
@@ -534,41 +1055,88 @@ def _finalize_job(
     error: str | None = None,
 ):
     """Update final job state."""
-    state = _read_state(job_dir)
-    state["state"] = "SUCCEEDED" if success else "FAILED"
-    state["current_stage"] = None
-    state["updated_at"] = _now()
+    with _STATE_LOCK:
+        journal = _JOB_JOURNALS.get(job_dir.name)
+        if journal is None:
+            # failed before the state was initialized
+            return
+
+        fields = {
+            "state": "SUCCEEDED" if success else "FAILED",
+            "current_stage": None,
+            "running_stages": [],
+        }
+
+        maven_stats = [
+            entry["maven_cache"]
+            for entry in journal.state["stages"].values()
+            if entry.get("maven_cache")
+        ]
+        if maven_stats:
+            fields["maven_cache"] = {
+                "hits": sum(1 for s in maven_stats if s["hit"]),
+                "misses": sum(1 for s in maven_stats if not s["hit"]),
+                "downloaded_artifacts": sum(s["downloaded_artifacts"] for s in maven_stats),
+                "downloaded_bytes": sum(s["downloaded_bytes"] for s in maven_stats),
+            }
+
+        if error:
+            fields["error"] = error
 
-    if error:
-        state["error"] = error
+        _record_event(job_dir, {"type": "job", "fields": fields})
+        # compact: a finished job is read from the snapshot alone
+        journal.snapshot()
 
-    _write_state(job_dir, state)
+    # Build the downloadable reports archive once, not per request
+    if (job_dir / "reports").is_dir():
+        try:
+            report_archive.build_report_archive(job_dir)
+        except Exception as e:
+            print(f"Warning: Could not build reports archive: {e}")
 
 
 def _stop_runner_container(job_id: str):
-    """Stop and remove the runner container."""
-    subprocess.run(
-        ["docker", "rm", "-f", f"runner-{job_id}"],
-        check=False,
-    )
+    """Return the runner container to the pool and top the pool up."""
+    runner = _JOB_RUNNERS.pop(job_id, None)
+    if runner is None:
+        return
+
+    runner_pool.release(runner)
+
+    try:
+        runner_pool.refill(runner.image)
+    except Exception as e:
+        print(f"Warning: could not refill runner pool: {e}")
 
-def resolve_topology(stage: str, metadata: dict) -> dict:
+def _live_app_stages(metadata: dict, stages: dict) -> set[str]:
     """
-    Returns which services are required for this stage.
+    Stages running against the shared app instance. DAST always needs
+    it; SMOKE-TEST uses it when DAST follows or a database is required,
+    a lone smoke test starts the jar inside the runner container.
+    """
+    selected = {stage for stage, status in stages.items() if status == "PENDING"}
+    requires_db = metadata.get("stack", {}).get("requires_db", False)
+
+    live_stages = set()
+    if "DAST" in selected:
+        live_stages.add("DAST")
+    if "SMOKE-TEST" in selected and (live_stages or requires_db):
+        live_stages.add("SMOKE-TEST")
+
+    return live_stages
+
+
+def resolve_topology(live_stages: set[str], metadata: dict) -> dict:
+    """
+    Returns which services the shared app instance needs.
     """
     topology = {
         "app": True,
-        "db": False,
-        "zap": False,
+        "db": metadata.get("stack", {}).get("requires_db", False),
+        "smoke": "SMOKE-TEST" in live_stages,
+        "zap": "DAST" in live_stages,
     }
 
-    if stage == "SMOKE-TEST":
-        topology["db"] = metadata.get("stack", {}).get("requires_db", False)
-
-    if stage == "DAST":
-        topology["zap"] = True
-        topology["db"] = metadata.get("stack", {}).get("requires_db", False)
-
     if topology["zap"] and not topology["app"]:
         raise RuntimeError("Invalid topology: zap requires app")
 
@@ -577,20 +1145,18 @@ def resolve_topology(stage: str, metadata: dict) -> dict:
 
     return topology
 
-def needs_compose(topology: dict) -> bool:
-    return topology["db"] or topology["zap"]
-
-def select_compose_files(stage: str, topology: dict) -> list[str]:
-    files = ["base.yml"]
-
-    if stage == "DAST":
-        files.append("app-jar.yml")
-    else:
-        files.append("app-runner.yml")
+def select_compose_files(topology: dict) -> list[str]:
+    files = ["base.yml", "app-jar.yml"]
 
     if topology["db"]:
         files.extend(["db.yml", "app-db.yml"])
 
+    if topology.get("db_template"):
+        files.append("db-data.yml")
+
+    if topology["smoke"]:
+        files.append("smoke.yml")
+
     if topology["zap"]:
         files.extend(["zap.yml", "app-zap.yml"])
 
@@ -0,0 +1,50 @@
+from celery_app import celery_app
+from services import (
+    git_mirror_cache,
+    maven_cache,
+    semgrep_rules,
+    stage_result_cache,
+    trivy_db,
+    workspace_retention,
+)
+# module, not the name: job_execution may still be importing (via celery_app)
+from tasks import job_execution
+
+
+@celery_app.task(name="sweep_workspaces")
+def sweep_workspaces():
+    """Compress, evict and expire workspaces (retention + disk quota)."""
+    stats = workspace_retention.sweep()
+    print(f"[RETENTION] {stats}")
+    return stats
+
+
+@celery_app.task(name="evict_maven_cache")
+def evict_maven_cache():
+    """Trim the shared maven repository, sparing artifacts active jobs may use."""
+    return {"freed_bytes": maven_cache.evict()}
+
+
+@celery_app.task(name="evict_git_mirrors")
+def evict_git_mirrors():
+    """Keep the repository mirrors under GIT_MIRROR_MAX_BYTES (LRU)."""
+    return {"freed_bytes": git_mirror_cache.evict()}
+
+
+@celery_app.task(name="prune_stage_results")
+def prune_stage_results():
+    """Drop stage results older than STAGE_RESULT_CACHE_TTL."""
+    return {"removed": stage_result_cache.prune()}
+
+
+@celery_app.task(name="refresh_trivy_db")
+def refresh_trivy_db():
+    """Download a new trivy DB version and switch SCA scans over to it."""
+    version = trivy_db.refresh(job_execution.JAVA_MAVEN_RUNNER_IMAGE)
+    return {"version": version, "db": trivy_db.db_info(version) if version else None}
+
+
+@celery_app.task(name="refresh_semgrep_rules")
+def refresh_semgrep_rules():
+    """Download the SAST rule pack so scans never hit the registry."""
+    return {"version": semgrep_rules.refresh()}
@@ -0,0 +1,151 @@
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+from typing import Callable
+from urllib.parse import quote
+
+from config import DOCKER_SOCKET
+
+API_VERSION = "v1.41"  # Docker Engine 20.10+
+
+# stream ids of the multiplexed exec output (non-TTY)
+STDOUT, STDERR = 1, 2
+
+# control requests reuse one connection per thread (stage threads run in parallel)
+_local = threading.local()
+
+
+class DockerAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _connection() -> _UnixHTTPConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _UnixHTTPConnection(DOCKER_SOCKET, timeout=60)
+    return conn
+
+
+def _send(conn: http.client.HTTPConnection, method: str, path: str, body: dict | None):
+    payload = json.dumps(body).encode("utf-8") if body is not None else None
+    headers = {"Content-Type": "application/json"} if payload is not None else {}
+    conn.request(method, f"/{API_VERSION}{path}", body=payload, headers=headers)
+    return conn.getresponse()
+
+
+def _check(response: http.client.HTTPResponse, data: bytes) -> bytes:
+    if response.status >= 400:
+        try:
+            message = json.loads(data).get("message", "")
+        except ValueError:
+            message = data.decode("utf-8", "replace")
+        raise DockerAPIError(response.status, message)
+    return data
+
+
+def request(method: str, path: str, body: dict | None = None):
+    """JSON request on the thread's persistent connection (reconnects once)."""
+    for attempt in (1, 2):
+        conn = _connection()
+        try:
+            response = _send(conn, method, path, body)
+            data = response.read()
+            break
+        except (http.client.HTTPException, ConnectionError, OSError):
+            # daemon closed the idle keep-alive connection
+            conn.close()
+            if attempt == 2:
+                raise
+
+    data = _check(response, data)
+    return json.loads(data) if data else None
+
+
+def _write_fd(stream: int, chunk: bytes):
+    # same destination the CLI wrote to: the worker's stdout / stderr
+    os.write(1 if stream == STDOUT else 2, chunk)
+
+
+def _demux(response: http.client.HTTPResponse, on_output: Callable[[int, bytes], None]):
+    """Split the multiplexed stream: 8 byte header (stream id, size) + payload."""
+    while True:
+        header = response.read(8)
+        if len(header) < 8:
+            return
+        stream, size = struct.unpack(">BxxxI", header)
+        chunk = response.read(size)
+        if chunk:
+            on_output(stream, chunk)
+
+
+def exec_run(
+    container: str,
+    cmd: list[str],
+    *,
+    env: list[str] | None = None,
+    user: str | None = None,
+    on_output: Callable[[int, bytes], None] | None = _write_fd,
+    timeout: float | None = None,
+) -> int:
+    """
+    Run `cmd` in a running container and return its exit code (from the
+    API, not inferred from the output). Output is streamed to `on_output`
+    as it arrives; None discards it. `user` overrides the container user.
+    """
+    config = {
+        "AttachStdout": True,
+        "AttachStderr": True,
+        "Tty": False,
+        "Cmd": cmd,
+        "Env": env or [],
+    }
+    if user:
+        config["User"] = user
+
+    created = request(
+        "POST",
+        f"/containers/{quote(container, safe='')}/exec",
+        config,
+    )
+    exec_id = created["Id"]
+
+    # the start response takes over the connection until the command
+    # exits, so it gets its own
+    stream_conn = _UnixHTTPConnection(DOCKER_SOCKET, timeout=timeout)
+    try:
+        response = _send(stream_conn, "POST", f"/exec/{exec_id}/start",
+                         {"Detach": False, "Tty": False})
+        if response.status >= 400:
+            _check(response, response.read())
+        _demux(response, on_output or (lambda stream, chunk: None))
+    finally:
+        stream_conn.close()
+
+    return request("GET", f"/exec/{exec_id}/json")["ExitCode"]
+
+
+def container_running(container: str) -> bool:
+    try:
+        info = request("GET", f"/containers/{quote(container, safe='')}/json")
+    except DockerAPIError as e:
+        if e.status == 404:
+            return False
+        raise
+    return bool(info["State"]["Running"])
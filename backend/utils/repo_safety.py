@@ -1,6 +1,6 @@
 from pathlib import Path
 from utils.content_safety import reject_dangerous_file
-from utils.zip_safety import path_depth
+from utils.workspace_manifest import WorkspaceManifest, scan
 
 def scan_repo(
     repo_dir: Path,
@@ -8,24 +8,15 @@ def scan_repo(
     max_files: int,
     max_bytes: int,
     max_depth: int,
-):
-    total_size = 0
-    file_count = 0
+) -> WorkspaceManifest:
+    manifest = scan(
+        repo_dir,
+        max_files=max_files,
+        max_bytes=max_bytes,
+        max_depth=max_depth,
+    )
 
-    for path in repo_dir.rglob("*"):
-        if path.is_dir():
-            continue
+    for entry in manifest.files:
+        reject_dangerous_file(Path(entry.path))
 
-        file_count += 1
-        if file_count > max_files:
-            raise ValueError("Repository contains too many files")
-
-        if path_depth(str(path.relative_to(repo_dir))) > max_depth:
-            raise ValueError("Repository directory depth exceeded")
-
-        size = path.stat().st_size
-        total_size += size
-        if total_size > max_bytes:
-            raise ValueError("Repository size limit exceeded")
-
-        reject_dangerous_file(path)
+    return manifest
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import stat
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str  # POSIX path relative to the manifest root
+    size: int
+    mode: int
+    is_dir: bool = False
+    is_symlink: bool = False
+
+    @property
+    def depth(self) -> int:
+        return self.path.count("/") + 1
+
+    @property
+    def ext(self) -> str:
+        name = self.path.rsplit("/", 1)[-1]
+        dot = name.rfind(".")
+        return name[dot:].lower() if dot > 0 else ""
+
+
+@dataclass
+class WorkspaceManifest:
+    """
+    Result of a single walk over a source tree. Safety scan, contract
+    validation and permission setup read from it instead of walking
+    the tree again.
+    """
+    root: Path
+    files: list[ManifestEntry] = field(default_factory=list)
+    dirs: list[ManifestEntry] = field(default_factory=list)
+    total_bytes: int = 0
+
+    def __post_init__(self):
+        self._paths = None
+        self._by_ext = None
+
+    def exists(self, rel_path: str) -> bool:
+        if self._paths is None:
+            self._paths = {e.path for e in self.files} | {e.path for e in self.dirs}
+        return rel_path.strip("/") in self._paths
+
+    def with_ext(self, ext: str) -> list[ManifestEntry]:
+        if self._by_ext is None:
+            self._by_ext = {}
+            for entry in self.files:
+                self._by_ext.setdefault(entry.ext, []).append(entry)
+        return self._by_ext.get(ext.lower(), [])
+
+    def glob(self, pattern: str) -> list[ManifestEntry]:
+        """Files matching a recursive glob pattern (same rules as glob.glob)."""
+        return self.matching(compile_glob(pattern))
+
+    def matching(self, regex: re.Pattern) -> list[ManifestEntry]:
+        return [e for e in self.files if regex.match(e.path)]
+
+    def save(self, path: Path):
+        payload = {
+            "root": str(self.root),
+            "total_bytes": self.total_bytes,
+            "dirs": [[e.path, e.mode] for e in self.dirs],
+            "files": [
+                [e.path, e.size, e.mode, int(e.is_symlink)] for e in self.files
+            ],
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "WorkspaceManifest":
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return cls(
+            root=Path(payload["root"]),
+            total_bytes=payload["total_bytes"],
+            dirs=[ManifestEntry(p, 0, mode, is_dir=True) for p, mode in payload["dirs"]],
+            files=[
+                ManifestEntry(p, size, mode, is_symlink=bool(link))
+                for p, size, mode, link in payload["files"]
+            ],
+        )
+
+
+def scan(
+    root: Path,
+    *,
+    max_files: int | None = None,
+    max_bytes: int | None = None,
+    max_depth: int | None = None,
+) -> WorkspaceManifest:
+    """
+    Walk `root` once with os.scandir. Limits are enforced while walking,
+    so oversized trees are refused without being walked completely.
+    Symlinks are recorded but never followed.
+    """
+    manifest = WorkspaceManifest(root=root)
+    stack = [(str(root), "")]
+
+    while stack:
+        dir_path, prefix = stack.pop()
+
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                rel = prefix + entry.name
+                st = entry.stat(follow_symlinks=False)
+
+                if stat.S_ISDIR(st.st_mode):
+                    manifest.dirs.append(
+                        ManifestEntry(rel, 0, stat.S_IMODE(st.st_mode), is_dir=True)
+                    )
+                    stack.append((entry.path, rel + "/"))
+                    continue
+
+                if max_depth is not None and rel.count("/") + 1 > max_depth:
+                    raise ValueError("Repository directory depth exceeded")
+
+                manifest.files.append(
+                    ManifestEntry(
+                        rel,
+                        st.st_size,
+                        stat.S_IMODE(st.st_mode),
+                        is_symlink=stat.S_ISLNK(st.st_mode),
+                    )
+                )
+                manifest.total_bytes += st.st_size
+
+                if max_files is not None and len(manifest.files) > max_files:
+                    raise ValueError("Repository contains too many files")
+
+                if max_bytes is not None and manifest.total_bytes > max_bytes:
+                    raise ValueError("Repository size limit exceeded")
+
+    return manifest
+
+
+@lru_cache(maxsize=64)
+def compile_glob(pattern: str) -> re.Pattern:
+    """
+    Translate a glob pattern to a regex over POSIX relative paths.
+    Like glob.glob, wildcards never match names starting with a dot.
+    """
+    hidden = r"(?!\.)"
+    segments = pattern.strip("/").split("/")
+    regex = ""
+
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+
+        if segment == "**":
+            regex += (
+                rf"(?:{hidden}[^/]*(?:/{hidden}[^/]*)*)?" if last
+                else rf"(?:{hidden}[^/]*/)*"
+            )
+            continue
+
+        if not segment.startswith("."):
+            regex += hidden
+        for ch in segment:
+            if ch == "*":
+                regex += "[^/]*"
+            elif ch == "?":
+                regex += "[^/]"
+            else:
+                regex += re.escape(ch)
+        if not last:
+            regex += "/"
+
+    return re.compile(regex + r"\Z")
@@ -0,0 +1,87 @@
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from utils.workspace_manifest import compile_glob
+
+CONTRACTS_DIR = Path(__file__).resolve().parents[1] / "contracts"
+
+
+@dataclass(frozen=True)
+class FileRule:
+    pattern: str
+    regex: re.Pattern
+    min_count: int
+
+
+@dataclass(frozen=True)
+class TextCheck:
+    value: str
+    needle: bytes
+    ext: str
+    exactly_one: bool
+
+
+@dataclass(frozen=True)
+class Contract:
+    name: str
+    required_paths: tuple[str, ...]
+    required_files: tuple[FileRule, ...]
+    semantic_checks: tuple[TextCheck, ...]
+    optional_paths: tuple[str, ...]
+
+
+def stack_key(stack: dict) -> str:
+    """'spring-boot' + 'maven' -> 'spring-boot-maven' (contract / pipeline name)."""
+    framework = (stack.get("framework") or "").strip().lower()
+    build_tool = (stack.get("build_tool") or "").strip().lower()
+    return f"{framework}-{build_tool}"
+
+
+def _compile(name: str, raw: dict) -> Contract:
+    checks = []
+    for check in raw.get("semantic_checks", []):
+        if check["type"] != "contains_text":
+            raise ValueError(f"Contract {name}: unknown check type {check['type']}")
+        checks.append(
+            TextCheck(
+                value=check["value"],
+                needle=check["value"].encode("utf-8"),
+                ext=check.get("ext", ".java"),
+                exactly_one=bool(check.get("exactly_one")),
+            )
+        )
+
+    return Contract(
+        name=name,
+        required_paths=tuple(raw.get("required_paths", [])),
+        required_files=tuple(
+            FileRule(
+                pattern=rule["pattern"],
+                regex=compile_glob(rule["pattern"]),
+                min_count=rule.get("min_count", 1),
+            )
+            for rule in raw.get("required_files", [])
+        ),
+        semantic_checks=tuple(checks),
+        optional_paths=tuple(raw.get("optional_paths", [])),
+    )
+
+
+@lru_cache(maxsize=1)
+def load_contracts() -> dict[str, Contract]:
+    """Read and compile every contract once per process."""
+    return {
+        path.stem: _compile(path.stem, json.loads(path.read_text(encoding="utf-8")))
+        for path in sorted(CONTRACTS_DIR.glob("*.json"))
+    }
+
+
+def get_contract(stack: dict) -> Contract:
+    key = stack_key(stack)
+    contract = load_contracts().get(key)
+    if contract is None:
+        raise ValueError(f"Unsupported stack: no structure contract for '{key}'")
+    return contract
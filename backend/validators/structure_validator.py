@@ -1,6 +1,22 @@
-import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-import glob
+
+from config import CONTRACT_SCAN_WORKERS
+from utils.workspace_manifest import WorkspaceManifest, ManifestEntry, scan
+from validators.contract_registry import Contract, TextCheck
+
+# Files up to this size are read in one go, larger ones are mmap'ed
+_SMALL_FILE_BYTES = 64 * 1024
+
+# Text checks of all admissions share this pool
+_scan_pool = ThreadPoolExecutor(
+    max_workers=CONTRACT_SCAN_WORKERS,
+    thread_name_prefix="contract-scan",
+)
+
 
 class ValidationResult:
     def __init__(self):
@@ -16,39 +32,105 @@ class ValidationResult:
         return "ACCEPTED"
 
 
-def validate_structure(source_dir: Path, contract_path: Path) -> ValidationResult:
+def _file_contains(path: Path, needle: bytes, stop: threading.Event) -> bool:
+    if stop.is_set():
+        return False
+
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(needle):
+                return False
+            if size <= _SMALL_FILE_BYTES:
+                return needle in f.read()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm.find(needle) != -1
+    except (OSError, ValueError):
+        return False
+
+
+def _count_files_containing(
+    source_dir: Path,
+    entries: list[ManifestEntry],
+    needle: bytes,
+    limit: int,
+) -> int:
+    """Number of files containing `needle`, counting stops at `limit`."""
+    stop = threading.Event()
+    futures = [
+        _scan_pool.submit(_file_contains, source_dir / entry.path, needle, stop)
+        for entry in entries
+        if entry.is_symlink or entry.size >= len(needle)
+    ]
+
+    count = 0
+    try:
+        for future in as_completed(futures):
+            if future.result():
+                count += 1
+                if count >= limit:
+                    break
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+
+    return count
+
+
+def _check_text(
+    source_dir: Path,
+    manifest: WorkspaceManifest,
+    check: TextCheck,
+    result: ValidationResult,
+):
+    if not check.exactly_one:
+        # nothing depends on the count
+        return
+
+    count = _count_files_containing(
+        source_dir, manifest.with_ext(check.ext), check.needle, limit=2
+    )
+    if count != 1:
+        found = "none" if count == 0 else "more than one"
+        result.errors.append(
+            f"Expected exactly one occurrence of {check.value}, found {found}"
+        )
+
+
+def validate_structure(
+    source_dir: Path,
+    contract: Contract,
+    manifest: WorkspaceManifest | None = None,
+) -> ValidationResult:
+    """
+    Checks run cheapest first: path lookups and glob rules are answered
+    from the manifest, text checks only run (and read files) when the
+    contract is not already refused.
+    """
     result = ValidationResult()
-    contract = json.loads(contract_path.read_text())
+    manifest = manifest or scan(source_dir)
 
     # --- Required paths ---
-    for rel_path in contract.get("required_paths", []):
-        if not (source_dir / rel_path).exists():
+    for rel_path in contract.required_paths:
+        if not manifest.exists(rel_path):
             result.errors.append(f"Missing required path: {rel_path}")
 
     # --- Required files ---
-    for rule in contract.get("required_files", []):
-        matches = glob.glob(str(source_dir / rule["pattern"]), recursive=True)
-        if len(matches) < rule.get("min_count", 1):
+    for rule in contract.required_files:
+        if len(manifest.matching(rule.regex)) < rule.min_count:
             result.errors.append(
-                f"Expected at least {rule['min_count']} file(s) matching {rule['pattern']}"
+                f"Expected at least {rule.min_count} file(s) matching {rule.pattern}"
             )
 
-    # --- Semantic checks ---
-    for check in contract.get("semantic_checks", []):
-        if check["type"] == "contains_text":
-            count = 0
-            for file in source_dir.rglob("*.java"):
-                if check["value"] in file.read_text(errors="ignore"):
-                    count += 1
-
-            if check.get("exactly_one") and count != 1:
-                result.errors.append(
-                    f"Expected exactly one occurrence of {check['value']}, found {count}"
-                )
-
     # --- Optional paths ---
-    for rel_path in contract.get("optional_paths", []):
-        if not (source_dir / rel_path).exists():
+    for rel_path in contract.optional_paths:
+        if not manifest.exists(rel_path):
             result.warnings.append(f"Optional path not found: {rel_path}")
 
+    # --- Semantic checks ---
+    if not result.errors:
+        for check in contract.semantic_checks:
+            _check_text(source_dir, manifest, check, result)
+
     return result
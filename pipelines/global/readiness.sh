@@ -0,0 +1,85 @@
+#!/usr/bin/env bash
+# Application readiness probe, sourced by smoke-test.sh and dast.sh.
+#
+#   wait_for_app [--log FILE] [--pid PID] [--health URL] [--port HOST:PORT] [--timeout SECONDS]
+#
+# Polls with a short, growing interval (0.2s up to 2s) until one of:
+#   log     the Spring Boot "Started <App> in N seconds" line is in FILE
+#   health  URL answers 2xx
+#   port    HOST:PORT accepts connections (only trusted when there is no
+#           health URL or the app has no such endpoint, i.e. 404)
+# Fails early when PID exits. Sets READY_SIGNAL, READY_MS (wait time),
+# SPRING_STARTUP_SECONDS (as logged by Spring, when seen) and READY_ERROR.
+
+_readiness_now_ms() {
+  date +%s%3N
+}
+
+_readiness_port_open() {
+  local host="${1%:*}" port="${1##*:}"
+  timeout 2 bash -c "exec 3<>/dev/tcp/${host}/${port}" 2>/dev/null
+}
+
+wait_for_app() {
+  local log="" pid="" health="" port="" timeout="${APP_READY_TIMEOUT:-120}"
+
+  while [[ $# -gt 0 ]]; do
+    case "$1" in
+      --log) log="$2"; shift 2 ;;
+      --pid) pid="$2"; shift 2 ;;
+      --health) health="$2"; shift 2 ;;
+      --port) port="$2"; shift 2 ;;
+      --timeout) timeout="$2"; shift 2 ;;
+      *) echo "wait_for_app: unknown option $1" >&2; return 2 ;;
+    esac
+  done
+
+  READY_SIGNAL=""
+  READY_MS=0
+  READY_ERROR=""
+  SPRING_STARTUP_SECONDS=""
+
+  local started deadline delay_ms=200 code="" started_line=""
+  started=$(_readiness_now_ms)
+  deadline=$((started + timeout * 1000))
+
+  while :; do
+    if [[ -n "$log" && -f "$log" ]]; then
+      started_line=$(grep -m1 -E 'Started .+ in [0-9.]+ seconds' "$log" 2>/dev/null || true)
+      if [[ -n "$started_line" ]]; then
+        SPRING_STARTUP_SECONDS=$(sed -E 's/.* in ([0-9.]+) seconds.*/\1/' <<<"$started_line")
+        READY_SIGNAL="log"
+        break
+      fi
+    fi
+
+    if [[ -n "$health" ]]; then
+      code=$(curl -s -o /dev/null -w '%{http_code}' --max-time 2 "$health" 2>/dev/null || true)
+      if [[ "$code" == 2* ]]; then
+        READY_SIGNAL="health"
+        break
+      fi
+    fi
+
+    if [[ -n "$port" && ( -z "$health" || "$code" == "404" ) ]] && _readiness_port_open "$port"; then
+      READY_SIGNAL="port"
+      break
+    fi
+
+    if [[ -n "$pid" ]] && ! kill -0 "$pid" 2>/dev/null; then
+      READY_ERROR="application exited during startup"
+      break
+    fi
+
+    if (( $(_readiness_now_ms) >= deadline )); then
+      READY_ERROR="application not ready after ${timeout}s"
+      break
+    fi
+
+    sleep "$(printf '%d.%03d' $((delay_ms / 1000)) $((delay_ms % 1000)))"
+    delay_ms=$(( delay_ms * 2 > 2000 ? 2000 : delay_ms * 2 ))
+  done
+
+  READY_MS=$(( $(_readiness_now_ms) - started ))
+  [[ -n "$READY_SIGNAL" ]]
+}
@@ -14,7 +14,12 @@ mkdir -p "${REPORT_DIR}"
 START_TS=$(date +%s%3N)
 
 EXIT_CODE=0
-gitleaks git "$APP_DIR" --report-format json --report-path "${LOG_FILE}" || EXIT_CODE=$?
+# GITLEAKS_LOG_OPTS (e.g. "<last scanned>..<head>") limits the scan to new commits.
+# Without it the whole history of HEAD is scanned; gitleaks would otherwise
+# walk every ref (--all).
+# --redact: reports (and the backend's baseline) never contain the secrets
+gitleaks git "$APP_DIR" --log-opts="${GITLEAKS_LOG_OPTS:-HEAD}" \
+  --redact --report-format json --report-path "${LOG_FILE}" || EXIT_CODE=$?
 
 
 if [ $EXIT_CODE -eq 0 ]; then
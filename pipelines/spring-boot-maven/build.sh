@@ -14,11 +14,14 @@ mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
 
+# The only clean of the job: in incremental mode TEST and PACKAGE
+# continue from this target/ (MAVEN_EXTRA_ARGS: -T ... from the backend)
 rm -rf "${APP_DIR}/target" || true
 sync
 
 if mvn -f "${APP_DIR}/pom.xml" -DskipTests clean compile \
-     -B -ntp \
+     ${MAVEN_EXTRA_ARGS:-} \
+     -B \
      >"$LOG_FILE" 2>&1; then
   STATUS="SUCCESS"
   MESSAGE="${STAGE} stage succeeded"
@@ -11,6 +11,9 @@ REPORT_FILE="${REPORT_DIR}/result.json"
 APP_PORT="${APP_PORT:-8080}"
 TARGET_URL="http://app:${APP_PORT}"
 
+# shellcheck source=../global/readiness.sh
+source "$(dirname "${BASH_SOURCE[0]}")/../global/readiness.sh"
+
 OUT_DIR="/zap/wrk"
 
 mkdir -p "${OUT_DIR}"
@@ -34,25 +37,18 @@ EOF
 }' ERR EXIT
 
 # ---- WAIT FOR APP (REQUIRED WHEN DB IS ENABLED) ----
-READY=false
-for i in $(seq 1 20); do
-  if curl -fs "${TARGET_URL}/actuator/health" >/dev/null 2>&1; then
-    READY=true
-    break
-  fi
-  sleep 3
-done
-
-if [ "$READY" != "true" ]; then
+if ! wait_for_app --health "${TARGET_URL}/actuator/health" --port "app:${APP_PORT}"; then
   cat > "${REPORT_FILE}" <<EOF
 {
   "stage": "${STAGE}",
   "status": "FAILED",
-  "message": "Application not reachable before DAST"
+  "startup_ms": ${READY_MS},
+  "message": "Application not reachable before DAST: ${READY_ERROR}"
 }
 EOF
   exit 1
 fi
+echo "App ready (${READY_SIGNAL}) after ${READY_MS}ms"
 
 #raw command, ill keep it for now . 
 # docker run --rm \
@@ -94,6 +90,8 @@ cat > "result.json" <<EOF
   "stage": "${STAGE}",
   "status": "${STATUS}",
   "duration_ms": ${DURATION},
+  "startup_ms": ${READY_MS},
+  "ready_signal": "${READY_SIGNAL}",
   "message": "${MESSAGE}"
 }
 EOF
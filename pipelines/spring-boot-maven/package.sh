@@ -14,8 +14,15 @@ mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
 
-if mvn -f "${APP_DIR}/pom.xml" clean package -DskipTests \
-      -B -ntp \
+# Incremental mode reuses the classes compiled by BUILD / TEST
+GOALS="clean package"
+if [ "${PIPELINE_INCREMENTAL:-false}" = "true" ]; then
+  GOALS="package"
+fi
+
+if mvn -f "${APP_DIR}/pom.xml" ${GOALS} -DskipTests \
+      ${MAVEN_EXTRA_ARGS:-} \
+      -B \
       >"$LOG_FILE" 2>&1; then
   STATUS="SUCCESS"
   MESSAGE="${STAGE} stage succeeded"
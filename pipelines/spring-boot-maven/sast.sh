@@ -13,8 +13,17 @@ mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
 
+# Rule pack cached by the backend (SEMGREP_RULES_FILE), registry otherwise
+SEMGREP_CONFIG="p/java"
+RULES_VERSION="p/java@registry"
+if [ -n "${SEMGREP_RULES_FILE:-}" ] && [ -f "${SEMGREP_RULES_FILE}" ]; then
+    SEMGREP_CONFIG="${SEMGREP_RULES_FILE}"
+    RULES_VERSION="${SEMGREP_RULES_VERSION:-${SEMGREP_RULES_FILE##*/}}"
+fi
+
 EXIT_CODE=0 #to stop exit on fails 
-semgrep --config=p/java --json --output "${LOG_FILE}" "${APP_DIR}" || EXIT_CODE=$? #to  stop exit on fails
+semgrep --config="${SEMGREP_CONFIG}" --metrics=off --disable-version-check \
+    --json --output "${LOG_FILE}" "${APP_DIR}" || EXIT_CODE=$? #to  stop exit on fails
 
 if [ $EXIT_CODE -eq 0 ]; then
     STATUS="SUCCESS"
@@ -38,7 +47,8 @@ cat > "${REPORT_FILE}" <<EOF
   "stage": "${STAGE}",
   "status": "${STATUS}",
   "duration_ms": ${DURATION},
-  "message": "${MESSAGE}"
+  "message": "${MESSAGE}",
+  "rules": "${RULES_VERSION}"
 }
 EOF
 
@@ -13,6 +13,12 @@ mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
 
+# Shared pre-downloaded DB (TRIVY_CACHE_DIR + TRIVY_SKIP_*_UPDATE set by the
+# backend). Runners started before the cache existed don't see it: download.
+if [ -n "${TRIVY_CACHE_DIR:-}" ] && [ ! -f "${TRIVY_CACHE_DIR}/db/trivy.db" ]; then
+    unset TRIVY_CACHE_DIR TRIVY_SKIP_DB_UPDATE TRIVY_SKIP_JAVA_DB_UPDATE
+fi
+
 #l || to prevent set -e and -u from killing the pipeline
 EXIT_CODE=0
 trivy fs --scanners vuln "${APP_DIR}/pom.xml" --format json --output "${LOG_FILE}" || EXIT_CODE=$?
@@ -39,7 +45,8 @@ cat > "${REPORT_FILE}" <<EOF
   "stage": "${STAGE}",
   "status": "${STATUS}",
   "duration_ms": ${DURATION},
-  "message": "${MESSAGE}"
+  "message": "${MESSAGE}",
+  "trivy_cache_dir": "${TRIVY_CACHE_DIR:-}"
 }
 EOF
 
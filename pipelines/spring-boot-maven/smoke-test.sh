@@ -11,6 +11,9 @@ REPORT_FILE="${REPORT_DIR}/result.json"
 LOG_FILE="${REPORT_DIR}/${STAGE}.log"
 APP_PORT="${APP_PORT:-8080}"
 
+# shellcheck source=../global/readiness.sh
+source "$(dirname "${BASH_SOURCE[0]}")/../global/readiness.sh"
+
 mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
@@ -29,10 +32,20 @@ trap '{
 EOF
 }' ERR
 
-JAR_FILE=$(ls "${APP_DIR}/target/"*.jar 2>/dev/null | head -n 1)
+READY=false
 
-if [[ -z "${JAR_FILE}" ]]; then
-  cat > "${REPORT_FILE}" <<EOF
+if [[ -n "${SMOKE_TARGET_HOST:-}" ]]; then
+  # Live app phase: the app service is already running (and stays up for DAST)
+  TARGET="${SMOKE_TARGET_HOST}:${APP_PORT}"
+  echo "Waiting for app at ${TARGET}..."
+  if wait_for_app --health "http://${TARGET}/actuator/health" --port "${TARGET}"; then
+    READY=true
+  fi
+else
+  JAR_FILE=$(ls "${APP_DIR}/target/"*.jar 2>/dev/null | head -n 1)
+
+  if [[ -z "${JAR_FILE}" ]]; then
+    cat > "${REPORT_FILE}" <<EOF
 {
   "stage": "${STAGE}",
   "status": "FAILED",
@@ -40,55 +53,57 @@ if [[ -z "${JAR_FILE}" ]]; then
   "message": "No JAR found to run"
 }
 EOF
-  exit 1
-fi
-
-echo "Starting app: ${JAR_FILE}"
-java -jar "${JAR_FILE}" >"$LOG_FILE" 2>&1 &
-APP_PID=$!
-
-echo "Waiting 10s for app to initialize..."
-sleep 10
-
-READY=false
-for i in $(seq 1 10); do
-  echo "Port check attempt $i..."
-  if bash -c "</dev/tcp/localhost/${APP_PORT}" 2>/dev/null; then
-    READY=true
-    break
+    exit 1
   fi
-  sleep 3
-done
 
+  echo "Starting app: ${JAR_FILE}"
+  java -jar "${JAR_FILE}" >"$LOG_FILE" 2>&1 &
+  APP_PID=$!
+
+  echo "Waiting for app to become ready..."
+  if wait_for_app \
+      --log "$LOG_FILE" \
+      --pid "$APP_PID" \
+      --health "http://localhost:${APP_PORT}/actuator/health" \
+      --port "localhost:${APP_PORT}"; then
+    # the Started line alone does not prove the web server is listening
+    if _readiness_port_open "localhost:${APP_PORT}"; then
+      READY=true
+    else
+      READY_ERROR="application started but port ${APP_PORT} is not reachable"
+    fi
+  fi
 
-echo "Stopping app..."
-kill "$APP_PID" >/dev/null 2>&1 || true
-# Give JVM time to exit cleanly
-for i in $(seq 1 10); do
+  echo "Stopping app..."
+  kill "$APP_PID" >/dev/null 2>&1 || true
+  # Give JVM time to exit cleanly
+  for i in $(seq 1 10); do
+    if ps -p "$APP_PID" > /dev/null; then
+      sleep 1
+    else
+      break
+    fi
+  done
+
+  # Force kill if still alive
   if ps -p "$APP_PID" > /dev/null; then
-    sleep 1
-  else
-    break
+    echo "Force killing app..."
+    kill -9 "$APP_PID" >/dev/null 2>&1 || true
   fi
-done
-
-# Force kill if still alive
-if ps -p "$APP_PID" > /dev/null; then
-  echo "Force killing app..."
-  kill -9 "$APP_PID" >/dev/null 2>&1 || true
+  wait "$APP_PID" 2>/dev/null || true
 fi
-wait "$APP_PID" 2>/dev/null || true
+echo "Readiness: signal=${READY_SIGNAL:-none} after ${READY_MS}ms ${READY_ERROR}"
 
 END_TS=$(date +%s%3N)
 DURATION=$((END_TS - START_TS))
 
 if [[ "$READY" == true ]]; then
   STATUS="SUCCESS"
-  MESSAGE="Application started and health endpoint is reachable"
+  MESSAGE="Application started and is reachable on port ${APP_PORT}"
   EXIT_CODE=0
 else
   STATUS="FAILED"
-  MESSAGE="Health endpoint not reachable"
+  MESSAGE="${READY_ERROR:-Application not reachable}"
   EXIT_CODE=1
 fi
 
@@ -97,6 +112,9 @@ cat > "${REPORT_FILE}" <<EOF
   "stage": "${STAGE}",
   "status": "${STATUS}",
   "duration_ms": ${DURATION},
+  "startup_ms": ${READY_MS},
+  "ready_signal": "${READY_SIGNAL}",
+  "spring_startup_seconds": ${SPRING_STARTUP_SECONDS:-null},
   "message": "${MESSAGE}"
 }
 EOF
@@ -14,8 +14,10 @@ mkdir -p "${REPORT_DIR}"
 
 START_TS=$(date +%s%3N)
 
+# MAVEN_EXTRA_ARGS: -T / surefire forkCount, reuseForks from the backend
 if mvn -f "${APP_DIR}/pom.xml" test \
-      -B -ntp \
+      ${MAVEN_EXTRA_ARGS:-} \
+      -B \
       >"$LOG_FILE" 2>&1; then
   STATUS="SUCCESS"
   MESSAGE="${STAGE} stage succeeded"